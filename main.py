@@ -1,13 +1,21 @@
+import sys
+import argparse
 from pathlib import Path
-from utils.annotate import augment_data, check_and_copy_annotations
-from utils.extract import extract_frames
-from utils.hyperparams import optimize_hyperparameters
-from utils.baseline import train_yolo
-from utils.dataset import create_dataset_structure
-from utils.graph import plot_yolo_metrics
-from utils.video import create_inference_video
+from utils import profiling
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пайплайн обработки данных и обучения")
+    parser.add_argument("--pipeline", default=None, help="pipeline.yaml для запуска без меню")
+    parser.add_argument("stages", nargs="*", help="целевые этапы пайплайна (по умолчанию все включённые)")
+    parser.add_argument("--force", action="store_true", help="выполнить этапы без проверки актуальности")
+    parser.add_argument("--dry-run", action="store_true", help="только показать, что будет выполнено")
+    args = parser.parse_args()
+    if args.pipeline:
+        from utils.pipeline import run_pipeline
+
+        result = run_pipeline(args.pipeline, args.stages, args.force, args.dry_run)
+        sys.exit(1 if any(state in ("failed", "blocked") for state in result.values()) else 0)
+
     base_dir = Path(__file__).parent
     video_paths = [
         base_dir / "videos/video1.mov",
@@ -41,39 +49,68 @@ if __name__ == "__main__":
         
         choice = input("Выберите действие (0-11): ")
         
+        # Модули этапов импортируются при выборе: torch, ultralytics, albumentations и matplotlib
+        # загружаются только для тех действий, которым они нужны
         if choice == "1":
+            from utils.extract import extract_frames
+
             extract_frames(video_paths, frame_dir)
             print("Кадры извлечены. Перейдите к аннотации в LabelImg и выберите следующий шаг.")
         elif choice == "2":
+            from utils.annotate import check_and_copy_annotations
+            from utils.validate import validate_annotations
+
+            validate_annotations(frame_dir, annotation_dir, base_dir / "annotation_report.json")
             check_and_copy_annotations(frame_dir, annotation_dir, dataset_dir / "train/labels")
         elif choice == "3":
-            augment_data(frame_dir, annotation_dir, aug_image_dir, aug_annotation_dir)
+            from utils.annotate import augment_data
+
+            augment_data(frame_dir, annotation_dir, aug_image_dir, aug_annotation_dir, incremental=True)
         elif choice == "4":
-            create_dataset_structure(aug_image_dir, aug_annotation_dir, dataset_dir)
+            from utils.dataset import create_dataset_structure
+
+            create_dataset_structure(aug_image_dir, aug_annotation_dir, dataset_dir, incremental=True, materialize="hardlink")
         elif choice == "5":
+            from utils.baseline import train_yolo
+
             results_baseline = train_yolo(dataset_dir / "data.yaml", experiment_dir / "baseline")
         elif choice == "6":
+            from utils.hyperparams import optimize_hyperparameters
+
             results_opt1 = optimize_hyperparameters(dataset_dir / "data.yaml", experiment_dir / "optimized", experiment_dir, iteration=1)
         elif choice == "7":
+            from utils.hyperparams import optimize_hyperparameters
+
             results_opt2 = optimize_hyperparameters(dataset_dir / "data.yaml", experiment_dir / "optimized", experiment_dir, iteration=2)
         elif choice == "8":
+            from utils.hyperparams import optimize_hyperparameters
+
             results_opt1 = optimize_hyperparameters(dataset_dir / "data.yaml", experiment_dir / "optimized", experiment_dir, iteration=3)
         elif choice == "9":
+            from utils.hyperparams import optimize_hyperparameters
+
             results_opt2 = optimize_hyperparameters(dataset_dir / "data.yaml", experiment_dir / "optimized", experiment_dir, iteration=4)
         elif choice == "10":
-            plot_yolo_metrics(experiment_dir, experiment_dir / "baseline_metrics.png")
-            plot_yolo_metrics(experiment_dir, experiment_dir / "opt1_metrics.png")
-            plot_yolo_metrics(experiment_dir, experiment_dir / "opt2_metrics.png") 
-            plot_yolo_metrics(experiment_dir, experiment_dir / "opt3_metrics.png")
-            plot_yolo_metrics(experiment_dir, experiment_dir / "opt4_metrics.png") 
+            from utils.graph import generate_metrics_report, plot_yolo_metrics
+
+            metrics = plot_yolo_metrics(experiment_dir, base_dir / "annotations/plots")
+            if metrics:
+                generate_metrics_report(metrics, base_dir / "annotations/plots")
         elif choice == "11":
+            from utils.video import create_inference_video
+
             create_inference_video(
                 experiment_dir / "baseline9/weights/best.pt",
                 video_paths, 
-                base_dir / "inference.mp4"
+                base_dir / "inference.mp4",
+                motion_threshold=0.01
             )
         elif choice == "0":
             print("Выход из программы.")
             break
         else:
-            print("Неверный выбор. Введите число от 0 до 11.")
\ No newline at end of file
+            print("Неверный выбор. Введите число от 0 до 11.")
+
+        if profiling.enabled():
+            profiling.report(base_dir / "profiles" / f"step{choice}")
+            profiling.reset()
\ No newline at end of file
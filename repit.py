@@ -1,16 +1,18 @@
-import os
-import shutil
+import argparse
 from pathlib import Path
+from utils.propagate import propagate_labels
 
 # Настройки
-base_dir = Path("D:/dish_recignition/annotations")  
-base_file = "video6_frame_01809.txt" 
-start_frame = 1809  
-end_frame = 2157    
-interval = 3      
+parser = argparse.ArgumentParser(description="Копирование разметки кадра на диапазон кадров видео")
+parser.add_argument("--annotation-dir", default=Path(__file__).parent / "annotations", type=Path)
+parser.add_argument("--video", default="video6")
+parser.add_argument("--start", default=1809, type=int)
+parser.add_argument("--end", default=2157, type=int)
+parser.add_argument("--interval", default=3, type=int)
+args = parser.parse_args()
 
 
-base_path = base_dir / base_file
+base_path = args.annotation_dir / f"{args.video}_frame_{args.start:05d}.txt"
 
 
 if not base_path.exists():
@@ -18,17 +20,6 @@ if not base_path.exists():
     exit()
 
 
-with open(base_path, "r") as f:
-    base_content = f.readlines()
+propagate_labels({args.video: {"keyframes": [args.start], "end": args.end}}, args.annotation_dir, args.interval)
 
-
-for frame_num in range(start_frame, end_frame + 1, interval):
-    formatted_frame = f"{frame_num:05d}"
-    target_file = base_dir / f"video6_frame_{formatted_frame}.txt"
-    
-    with open(target_file, "w") as f:
-        f.writelines(base_content)
-    
-    print(f"Создан файл: {target_file}")
-
-print("Копирование завершено!")
\ No newline at end of file
+print("Копирование завершено!")
@@ -1,10 +1,14 @@
 import os
 import cv2
+import zlib
 import shutil
-import albumentations as A
+from concurrent.futures import ProcessPoolExecutor
+from utils import profiling
+from utils.manifest import fingerprint_files, load_manifest, load_previous_entries, save_manifest, same_content, remove_files
+from utils.store import store_fingerprint
 
 
-def check_and_copy_annotations(frame_dir, annotation_dir, output_annotation_dir):
+def check_and_copy_annotations(frame_dir, annotation_dir, output_annotation_dir, annotation_store=None):
     os.makedirs(output_annotation_dir, exist_ok=True)
     missing_annotations = []
     
@@ -13,7 +17,12 @@ def check_and_copy_annotations(frame_dir, annotation_dir, output_annotation_dir)
             annotation_path = os.path.join(annotation_dir, frame.replace(".jpg", ".txt"))
             output_path = os.path.join(output_annotation_dir, frame.replace(".jpg", ".txt"))
             
-            if os.path.exists(annotation_path):
+            if annotation_store is not None:
+                if frame[:-4] in annotation_store:
+                    annotation_store.write_yolo(frame[:-4], output_path)
+                else:
+                    missing_annotations.append(frame)
+            elif os.path.exists(annotation_path):
                 shutil.copyfile(annotation_path, output_path)
             else:
                 missing_annotations.append(frame)
@@ -24,55 +33,168 @@ def check_and_copy_annotations(frame_dir, annotation_dir, output_annotation_dir)
         print(f"Все аннотации скопированы в {output_annotation_dir}")
 
 
-def augment_data(image_dir, annotation_dir, output_image_dir, output_annotation_dir):
+def augment_data(image_dir, annotation_dir, output_image_dir, output_annotation_dir,
+                 copies=1, workers=None, seed=42, chunksize=16, incremental=False, manifest_path=None,
+                 annotation_store=None):
+    import albumentations as A
+
     os.makedirs(output_image_dir, exist_ok=True)
     os.makedirs(output_annotation_dir, exist_ok=True)
-    
-    transform = A.Compose([
+    if manifest_path is None:
+        manifest_path = os.path.join(os.path.dirname(os.path.normpath(output_image_dir)), "augment_manifest.json")
+
+    images = sorted(f for f in os.listdir(image_dir) if f.endswith(".jpg"))
+    config = {"transform": A.to_dict(_build_transform()), "copies": copies, "seed": seed}
+    previous = load_manifest(manifest_path, config) if incremental else {}
+
+    sources = {}
+    for image_name in images:
+        sources[f"{image_name}:image"] = os.path.join(image_dir, image_name)
+        if annotation_store is None:
+            sources[f"{image_name}:label"] = os.path.join(annotation_dir, image_name.replace(".jpg", ".txt"))
+    previous_fingerprints = {}
+    for image_name, entry in previous.items():
+        previous_fingerprints[f"{image_name}:image"] = entry["image"]
+        previous_fingerprints[f"{image_name}:label"] = entry["label"]
+    fingerprints = fingerprint_files(sources, previous_fingerprints)
+    if annotation_store is not None:
+        fingerprints.update(
+            (f"{image_name}:label", store_fingerprint(annotation_store, image_name[:-4])) for image_name in images
+        )
+
+    entries = {}
+    tasks = []
+    for image_name in images:
+        image_fp = fingerprints[f"{image_name}:image"]
+        label_fp = fingerprints[f"{image_name}:label"]
+        entry = previous.get(image_name)
+        if (entry is not None and same_content(entry["image"], image_fp) and same_content(entry["label"], label_fp)
+                and all(os.path.exists(os.path.join(output_image_dir, name)) for name in entry["outputs"])):
+            entries[image_name] = {**entry, "image": image_fp, "label": label_fp}
+            continue
+        entries[image_name] = {"image": image_fp, "label": label_fp, "outputs": []}
+        labels = None
+        if annotation_store is not None and label_fp is not None:
+            labels = annotation_store.labels(image_name[:-4])
+        tasks.append((image_name, image_dir, annotation_dir, labels, output_image_dir, output_annotation_dir,
+                      copies, seed))
+
+    stale = [
+        name for image_name, entry in previous.items() if image_name not in entries
+        for name in entry["outputs"]
+    ]
+    if not previous:
+        # Полная пересборка (другой конфиг, например меньше copies): выходы прошлой сборки больше не нужны
+        stale = [name for entry in load_previous_entries(manifest_path).values() for name in entry.get("outputs", [])]
+    _remove_outputs(stale, output_image_dir, output_annotation_dir)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_augment_worker) as executor:
+        for image_name, messages, outputs, profile in executor.map(_augment_image, tasks, chunksize=chunksize):
+            profiling.merge(profile)
+            for message in messages:
+                print(message)
+            if outputs:
+                entries[image_name]["outputs"] = outputs
+            else:
+                del entries[image_name]
+            if image_name in previous:
+                outdated = set(previous[image_name]["outputs"]) - set(outputs)
+                _remove_outputs(outdated, output_image_dir, output_annotation_dir)
+                stale.extend(outdated)
+
+    if not previous:
+        # Файлы, которых нет в манифесте (сборки до него), тоже попали бы в датасет
+        produced = {name for entry in entries.values() for name in entry["outputs"]}
+        orphans = {f for f in os.listdir(output_image_dir) if f.endswith(".jpg")} - produced
+        orphans |= {f[:-4] + ".jpg" for f in os.listdir(output_annotation_dir) if f.endswith(".txt")} - produced
+        _remove_outputs(orphans, output_image_dir, output_annotation_dir)
+        stale.extend(orphans)
+
+    save_manifest(manifest_path, config, entries)
+    if incremental:
+        print(f"Обработано изображений: {len(tasks)}, без изменений: {len(images) - len(tasks)}, "
+              f"удалено устаревших файлов: {len(stale)}")
+    print(f"Аугментированные данные сохранены в {output_image_dir} и {output_annotation_dir}")
+
+
+def _remove_outputs(names, output_image_dir, output_annotation_dir):
+    remove_files(os.path.join(output_image_dir, name) for name in names)
+    remove_files(os.path.join(output_annotation_dir, name.replace(".jpg", ".txt")) for name in names)
+
+
+def _build_transform():
+    import albumentations as A
+
+    return A.Compose([
         A.HorizontalFlip(p=0.5),
         A.RandomBrightnessContrast(p=0.3),
         A.Rotate(limit=30, p=0.3),
         A.RandomCrop(height=512, width=512, p=0.3),
         A.Resize(height=640, width=640)
     ], bbox_params=A.BboxParams(format="yolo", label_fields=["class_labels"]))
-    
-    for image_name in os.listdir(image_dir):
-        if image_name.endswith(".jpg"):
-            image_path = os.path.join(image_dir, image_name)
-            annotation_path = os.path.join(annotation_dir, image_name.replace(".jpg", ".txt"))
-            
-            image = cv2.imread(image_path)
-            if image is None:
-                print(f"Ошибка: Не удалось загрузить {image_path}")
-                continue
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            
-            bboxes = []
-            class_labels = []
-            if os.path.exists(annotation_path):
-                with open(annotation_path, "r") as f:
-                    for line in f:
-                        try:
-                            class_id, x_center, y_center, width, height = map(float, line.strip().split())
-                            bboxes.append([x_center, y_center, width, height])
-                            class_labels.append(int(class_id))
-                        except ValueError:
-                            print(f"Ошибка в аннотации: {annotation_path}")
-                            continue
-            
-            augmented = transform(image=image, bboxes=bboxes, class_labels=class_labels)
-            aug_image = augmented["image"]
-            aug_bboxes = augmented["bboxes"]
-            aug_labels = augmented["class_labels"]
-            
-            aug_image_name = f"aug_{image_name}"
-            aug_image_path = os.path.join(output_image_dir, aug_image_name)
+
+
+_transform = None
+
+
+def _init_augment_worker():
+    global _transform
+    cv2.setNumThreads(1)
+    _transform = _build_transform()
+
+
+def _augmented_name(image_name, copy_idx):
+    return f"aug_{image_name}" if copy_idx == 0 else f"aug{copy_idx}_{image_name}"
+
+
+def _augment_image(task):
+    image_name, image_dir, annotation_dir, labels, output_image_dir, output_annotation_dir, copies, seed = task
+    messages = []
+    outputs = []
+    image_path = os.path.join(image_dir, image_name)
+    annotation_path = os.path.join(annotation_dir, image_name.replace(".jpg", ".txt"))
+
+    with profiling.timer("imread"):
+        image = cv2.imread(image_path)
+    if image is None:
+        return image_name, [f"Ошибка: Не удалось загрузить {image_path}"], outputs, profiling.collect()
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    bboxes = []
+    class_labels = []
+    if labels is not None:
+        bboxes = labels[1].tolist()
+        class_labels = labels[0].tolist()
+    elif os.path.exists(annotation_path):
+        with open(annotation_path, "r") as f:
+            for line in f:
+                try:
+                    class_id, x_center, y_center, width, height = map(float, line.strip().split())
+                    bboxes.append([x_center, y_center, width, height])
+                    class_labels.append(int(class_id))
+                except ValueError:
+                    messages.append(f"Ошибка в аннотации: {annotation_path}")
+                    continue
+
+    image_seed = seed + zlib.crc32(image_name.encode("utf-8")) * copies
+    for copy_idx in range(copies):
+        _transform.set_random_seed((image_seed + copy_idx) % 2 ** 32)
+        with profiling.timer("augment"):
+            augmented = _transform(image=image, bboxes=bboxes, class_labels=class_labels)
+        aug_image = augmented["image"]
+        aug_bboxes = augmented["bboxes"]
+        aug_labels = augmented["class_labels"]
+
+        aug_image_name = _augmented_name(image_name, copy_idx)
+        aug_image_path = os.path.join(output_image_dir, aug_image_name)
+        with profiling.timer("imwrite"):
             cv2.imwrite(aug_image_path, cv2.cvtColor(aug_image, cv2.COLOR_RGB2BGR))
-            
-            aug_annotation_path = os.path.join(output_annotation_dir, aug_image_name.replace(".jpg", ".txt"))
-            with open(aug_annotation_path, "w") as f:
-                for bbox, label in zip(aug_bboxes, aug_labels):
-                    x_center, y_center, width, height = bbox
-                    f.write(f"{label} {x_center} {y_center} {width} {height}\n")
-    
-    print(f"Аугментированные данные сохранены в {output_image_dir} и {output_annotation_dir}")
\ No newline at end of file
+
+        aug_annotation_path = os.path.join(output_annotation_dir, aug_image_name.replace(".jpg", ".txt"))
+        with open(aug_annotation_path, "w") as f:
+            for bbox, label in zip(aug_bboxes, aug_labels):
+                x_center, y_center, width, height = bbox
+                f.write(f"{label} {x_center} {y_center} {width} {height}\n")
+        outputs.append(aug_image_name)
+    profiling.count("images_augmented", len(outputs))
+    return image_name, messages, outputs, profiling.collect()
@@ -0,0 +1,179 @@
+import ast
+import cv2
+import yaml
+import numpy as np
+from pathlib import Path
+from utils import profiling
+
+
+BACKENDS = ("torch", "onnx", "onnx_int8", "openvino")
+
+
+def export_model(model_path, fmt="onnx"):
+    model_path = Path(model_path)
+    if fmt == "onnx":
+        target = model_path.with_suffix(".onnx")
+    elif fmt == "openvino":
+        target = model_path.parent / f"{model_path.stem}_openvino_model"
+    else:
+        raise ValueError(f"Неизвестный формат экспорта: {fmt}")
+
+    if target.exists() and target.stat().st_mtime >= model_path.stat().st_mtime:
+        return target
+
+    from ultralytics import YOLO
+
+    print(f"Экспорт {model_path} в {fmt}...")
+    exported = YOLO(model_path).export(format=fmt, dynamic=True, imgsz=640)
+    return Path(exported)
+
+
+def load_backend(model_path, backend="torch", imgsz=640, conf=0.5, iou=0.7, num_threads=None):
+    if backend == "torch":
+        return TorchBackend(model_path, imgsz, conf, iou, num_threads)
+    if backend == "onnx":
+        return OnnxBackend(export_model(model_path, "onnx"), imgsz, conf, iou, num_threads)
+    if backend == "onnx_int8":
+        int8_path = Path(model_path).with_name(f"{Path(model_path).stem}_int8.onnx")
+        if not int8_path.exists():
+            raise FileNotFoundError(f"INT8 модель {int8_path} не найдена, сначала выполните квантизацию")
+        return OnnxBackend(int8_path, imgsz, conf, iou, num_threads)
+    if backend == "openvino":
+        return OpenVinoBackend(export_model(model_path, "openvino"), imgsz, conf, iou, num_threads)
+    raise ValueError(f"Неизвестный бэкенд: {backend}, ожидается один из {BACKENDS}")
+
+
+class TorchBackend:
+    def __init__(self, model_path, imgsz=640, conf=0.5, iou=0.7, num_threads=None):
+        import torch
+        from ultralytics import YOLO
+
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+        self.model = YOLO(model_path)
+        self.names = self.model.names
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+
+    def predict(self, frames):
+        results = self.model.predict(frames, imgsz=self.imgsz, conf=self.conf, iou=self.iou, verbose=False)
+        if profiling.enabled():
+            for stage, key in (("preprocess", "preprocess"), ("inference", "inference"), ("nms", "postprocess")):
+                profiling.observe(stage, sum(result.speed[key] for result in results))
+        return [result.boxes.data.cpu().numpy() for result in results]
+
+
+class _GraphBackend:
+    stride = 32
+    max_det = 300
+
+    def __init__(self, imgsz, conf, iou):
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+
+    def predict(self, frames):
+        with profiling.timer("preprocess"):
+            blob, transforms = self.preprocess(frames)
+        with profiling.timer("inference"):
+            outputs = self.run(blob)
+        with profiling.timer("nms"):
+            return [self.postprocess(output, transform) for output, transform in zip(outputs, transforms)]
+
+    def preprocess(self, frames):
+        same_shape = all(frame.shape == frames[0].shape for frame in frames)
+        letterboxed = [letterbox(frame, self.imgsz, auto=same_shape, stride=self.stride) for frame in frames]
+        images = np.stack([image for image, _ in letterboxed])
+        blob = np.ascontiguousarray(images[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+        return blob, [(frame.shape[:2], transform) for frame, (_, transform) in zip(frames, letterboxed)]
+
+    def postprocess(self, output, transform):
+        return postprocess_detections(output, transform, self.conf, self.iou, self.max_det)
+
+
+class OnnxBackend(_GraphBackend):
+    def __init__(self, model_path, imgsz=640, conf=0.5, iou=0.7, num_threads=None):
+        import onnxruntime as ort
+
+        super().__init__(imgsz, conf, iou)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+        if "stride" in metadata:
+            self.stride = int(metadata["stride"])
+
+    def run(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoBackend(_GraphBackend):
+    def __init__(self, model_dir, imgsz=640, conf=0.5, iou=0.7, num_threads=None):
+        import openvino as ov
+
+        super().__init__(imgsz, conf, iou)
+        model_dir = Path(model_dir)
+        core = ov.Core()
+        config = {"PERFORMANCE_HINT": "THROUGHPUT"}
+        if num_threads is not None:
+            config["INFERENCE_NUM_THREADS"] = num_threads
+        model = core.read_model(next(model_dir.glob("*.xml")))
+        self.compiled = core.compile_model(model, "CPU", config)
+        self.names = {}
+        metadata_path = model_dir / "metadata.yaml"
+        if metadata_path.exists():
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                metadata = yaml.safe_load(f)
+            self.names = metadata.get("names", {})
+            self.stride = int(metadata.get("stride", self.stride))
+
+    def run(self, blob):
+        return self.compiled(blob)[0]
+
+
+def letterbox(image, new_shape=640, auto=False, stride=32, color=(114, 114, 114)):
+    h, w = image.shape[:2]
+    gain = min(new_shape / h, new_shape / w)
+    new_unpad = (int(round(w * gain)), int(round(h * gain)))
+    dw, dh = new_shape - new_unpad[0], new_shape - new_unpad[1]
+    if auto:
+        dw, dh = dw % stride, dh % stride
+    dw, dh = dw / 2, dh / 2
+
+    if (w, h) != new_unpad:
+        image = cv2.resize(image, new_unpad, interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return image, (gain, left, top)
+
+
+def postprocess_detections(output, transform, conf=0.5, iou=0.7, max_det=300, max_wh=7680):
+    (orig_h, orig_w), (gain, pad_x, pad_y) = transform
+    predictions = output.T
+    scores = predictions[:, 4:]
+    classes = scores.argmax(axis=1)
+    confidences = scores[np.arange(len(scores)), classes]
+    keep = confidences > conf
+    if not keep.any():
+        return np.zeros((0, 6), dtype=np.float32)
+
+    xywh, confidences, classes = predictions[keep, :4], confidences[keep], classes[keep]
+    boxes = np.empty_like(xywh)
+    boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+    boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+    offset = boxes[:, :2] + classes[:, None] * max_wh
+    nms_boxes = np.concatenate([offset, boxes[:, 2:] - boxes[:, :2]], axis=1)
+    indices = cv2.dnn.NMSBoxes(nms_boxes.tolist(), confidences.tolist(), conf, iou)
+    indices = np.array(indices, dtype=np.int64).reshape(-1)[:max_det]
+
+    boxes = boxes[indices]
+    boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - pad_x) / gain).clip(0, orig_w)
+    boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - pad_y) / gain).clip(0, orig_h)
+    return np.concatenate([boxes, confidences[indices, None], classes[indices, None]], axis=1).astype(np.float32)
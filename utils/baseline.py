@@ -1,9 +1,9 @@
-from ultralytics import YOLO
+from utils.runcache import cached_train
 
 
 def train_yolo(dataset_yaml, experiment_name, epochs=100, batch_size=4, img_size=640):
-    model = YOLO("../yolo11s.pt")
-    results = model.train(
+    results = cached_train(
+        "../yolo11s.pt",
         data=dataset_yaml,
         epochs=epochs,
         batch=batch_size,
@@ -0,0 +1,254 @@
+import sys
+import json
+import time
+import platform
+import argparse
+import itertools
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import cv2
+import numpy as np
+
+
+STAGES = ("preprocess", "inference", "postprocess")
+HIGHER_IS_BETTER = {"fps": True, "latency_p95_ms": False, "warmup_ms": False, "peak_rss_mb": False}
+
+
+def run_benchmark(model_path, source, imgsz=(320, 480, 640), batch_sizes=(1,), threads=(None,),
+                  backends=("torch",), warmup=3, repeat=1, output_path=None):
+    from utils.backends import export_model
+    from utils.manifest import file_hash
+
+    model_path = Path(model_path)
+    for backend in backends:
+        if backend in ("onnx", "openvino"):
+            export_model(model_path, backend)
+
+    configs = list(itertools.product(backends, imgsz, batch_sizes, threads))
+    print(f"Бенчмарк {model_path}: {len(configs)} конфигураций")
+    results = []
+    for backend, size, batch_size, num_threads in configs:
+        # Каждая конфигурация в отдельном процессе: пиковая память и число потоков не наследуются от предыдущих
+        with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as executor:
+            result = executor.submit(
+                _benchmark_config, str(model_path), source, backend, size, batch_size, num_threads, warmup, repeat
+            ).result()
+        results.append(result)
+        print(
+            f"  {backend:>9} imgsz={size} batch={batch_size} threads={num_threads or 'auto'}: "
+            f"{result['fps']:.1f} кадр/с, p95 {result['latency_p95_ms']:.1f} мс, "
+            f"прогрев {result['warmup_ms']:.0f} мс, RSS {result['peak_rss_mb']:.0f} МБ"
+        )
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "model": str(model_path),
+        "model_hash": file_hash(model_path),
+        "source": source,
+        "system": _system_info(),
+        "results": results
+    }
+    if output_path is not None:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Результаты бенчмарка сохранены в {output_path}")
+    return report
+
+
+def compare_benchmarks(current, baseline, tolerance=0.1):
+    baseline_results = {_config_key(r): r for r in baseline["results"]}
+    comparison = {"regressions": [], "improvements": [], "missing": []}
+    for result in current["results"]:
+        key = _config_key(result)
+        if key not in baseline_results:
+            comparison["missing"].append(key)
+            continue
+        for metric, higher_is_better in HIGHER_IS_BETTER.items():
+            old, new = baseline_results[key][metric], result[metric]
+            change = (new - old) / max(abs(old), 1e-9)
+            entry = {"config": key, "metric": metric, "baseline": old, "current": new, "change": change}
+            worse = -change if higher_is_better else change
+            if worse > tolerance:
+                comparison["regressions"].append(entry)
+            elif worse < -tolerance:
+                comparison["improvements"].append(entry)
+
+    for label, entries in (("Регрессии", comparison["regressions"]), ("Улучшения", comparison["improvements"])):
+        for entry in entries:
+            backend, size, batch_size, num_threads = entry["config"]
+            print(
+                f"{label}: {backend} imgsz={size} batch={batch_size} threads={num_threads or 'auto'} "
+                f"{entry['metric']}: {entry['baseline']:.2f} -> {entry['current']:.2f} ({entry['change']:+.1%})"
+            )
+    for key in comparison["missing"]:
+        print(f"Нет в базовой линии: {key}")
+    comparison["passed"] = not comparison["regressions"]
+    print("Вердикт: " + ("без регрессий" if comparison["passed"] else f"регрессий: {len(comparison['regressions'])}")
+          + f" (допуск {tolerance:.0%})")
+    return comparison
+
+
+def synthetic_clip(count=120, width=1280, height=720, objects=6, seed=0):
+    rng = np.random.default_rng(seed)
+    background = np.tile(np.linspace(40, 200, width, dtype=np.uint8)[None, :, None], (height, 1, 3))
+    background = cv2.add(background, rng.integers(0, 30, (height, width, 3), dtype=np.uint8))
+    positions = rng.uniform((0, 0), (width, height), (objects, 2))
+    velocities = rng.uniform(-8, 8, (objects, 2))
+    sizes = rng.uniform(40, 200, (objects, 2))
+    colors = rng.integers(0, 256, (objects, 3))
+
+    frames = []
+    for _ in range(count):
+        frame = background.copy()
+        for (x, y), (w, h), color in zip(positions, sizes, colors):
+            cv2.rectangle(frame, (int(x), int(y)), (int(x + w), int(y + h)), color.tolist(), -1)
+        frames.append(frame)
+        positions = (positions + velocities) % (width, height)
+    return frames
+
+
+def load_frames(source):
+    if "synthetic" in source:
+        return synthetic_clip(source["synthetic"], seed=source.get("seed", 0))
+
+    from utils.dataset import dataset_images
+
+    images = dataset_images(source["data"], source.get("split", "test"))[:source.get("max_images")]
+    frames = [frame for frame in (cv2.imread(path) for path in images) if frame is not None]
+    if not frames:
+        raise ValueError(f"Нет изображений для бенчмарка в {source['data']} ({source.get('split', 'test')})")
+    return frames
+
+
+def _benchmark_config(model_path, source, backend, imgsz, batch_size, num_threads, warmup, repeat):
+    from utils.backends import load_backend
+
+    frames = load_frames(source)
+    batches = [frames[i:i + batch_size] for i in range(0, len(frames), batch_size)]
+
+    start = time.perf_counter()
+    model = load_backend(model_path, backend, imgsz=imgsz, conf=0.5, num_threads=num_threads)
+    load_s = time.perf_counter() - start
+    start = time.perf_counter()
+    _predict_stages(model, batches[0])
+    warmup_ms = (time.perf_counter() - start) * 1000
+    for batch in batches[1:warmup]:
+        _predict_stages(model, batch)
+
+    stage_times = {stage: [] for stage in STAGES}
+    latencies = []
+    start = time.perf_counter()
+    for batch in batches * repeat:
+        batch_start = time.perf_counter()
+        stages = _predict_stages(model, batch)
+        latencies.append((time.perf_counter() - batch_start) * 1000)
+        for stage in STAGES:
+            stage_times[stage].append(stages[stage] / len(batch))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "backend": backend,
+        "imgsz": imgsz,
+        "batch": batch_size,
+        "threads": num_threads,
+        "frames": len(frames) * repeat,
+        "load_s": load_s,
+        "warmup_ms": warmup_ms,
+        "fps": len(frames) * repeat / elapsed,
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "stages_ms": {stage: _percentiles(times) for stage, times in stage_times.items()},
+        "peak_rss_mb": _peak_rss_mb()
+    }
+
+
+def _predict_stages(model, frames):
+    if hasattr(model, "run"):
+        start = time.perf_counter()
+        blob, transforms = model.preprocess(frames)
+        preprocessed = time.perf_counter()
+        outputs = model.run(blob)
+        inferred = time.perf_counter()
+        for output, transform in zip(outputs, transforms):
+            model.postprocess(output, transform)
+        finished = time.perf_counter()
+        return {
+            "preprocess": (preprocessed - start) * 1000,
+            "inference": (inferred - preprocessed) * 1000,
+            "postprocess": (finished - inferred) * 1000
+        }
+
+    results = model.model.predict(frames, imgsz=model.imgsz, conf=model.conf, iou=model.iou, verbose=False)
+    return {stage: sum(result.speed[stage] for result in results) for stage in STAGES}
+
+
+def _percentiles(values):
+    return {
+        "mean": float(np.mean(values)),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99))
+    }
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        import psutil
+
+        return psutil.Process().memory_info().peak_wset / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _system_info():
+    import torch
+
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": mp.cpu_count(),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "opencv": cv2.__version__
+    }
+
+
+def _config_key(result):
+    return result["backend"], result["imgsz"], result["batch"], result["threads"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк инференса по бэкендам, размерам входа и батчам")
+    parser.add_argument("model", help="путь к best.pt")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--data", help="data.yaml, кадры берутся из выборки --split")
+    group.add_argument("--synthetic", type=int, help="сгенерировать синтетический ролик из N кадров")
+    parser.add_argument("--split", default="test")
+    parser.add_argument("--max-images", type=int, default=200)
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[320, 480, 640])
+    parser.add_argument("--batch", type=int, nargs="+", default=[1])
+    parser.add_argument("--threads", type=int, nargs="+", default=[0], help="0 - по умолчанию бэкенда")
+    parser.add_argument("--backend", nargs="+", default=["torch"], choices=("torch", "onnx", "onnx_int8", "openvino"))
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", default=None, help="JSON базовой линии для поиска регрессий")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        source = {"synthetic": args.synthetic}
+    else:
+        source = {"data": str(Path(args.data).resolve()), "split": args.split, "max_images": args.max_images}
+    report = run_benchmark(
+        args.model, source, args.imgsz, args.batch, [t or None for t in args.threads], args.backend,
+        args.warmup, args.repeat, args.output
+    )
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        raise SystemExit(0 if compare_benchmarks(report, baseline, args.tolerance)["passed"] else 1)
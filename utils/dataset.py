@@ -1,39 +1,219 @@
 import os
 import yaml
 import shutil
-from sklearn.model_selection import train_test_split
-
-
-def create_dataset_structure(image_dir, annotation_dir, dataset_dir):
-    images = [f for f in os.listdir(image_dir) if f.endswith(".jpg")]
-    train_images, temp_images = train_test_split(images, test_size=0.3, random_state=42)
-    val_images, test_images = train_test_split(temp_images, test_size=0.5, random_state=42)
-    
-    splits = {"train": train_images, "val": val_images, "test": test_images}
-    for split in splits:
-        split_image_dir = os.path.join(dataset_dir, split, "images")
-        split_label_dir = os.path.join(dataset_dir, split, "labels")
-        os.makedirs(split_image_dir, exist_ok=True)
-        os.makedirs(split_label_dir, exist_ok=True)
-        
-        for image in splits[split]:
-            src_image = os.path.join(image_dir, image)
-            src_label = os.path.join(annotation_dir, image.replace(".jpg", ".txt"))
-            dst_image = os.path.join(split_image_dir, image)
-            dst_label = os.path.join(split_label_dir, image.replace(".jpg", ".txt"))
-            
-            shutil.copyfile(src_image, dst_image)
-            if os.path.exists(src_label):
-                shutil.copyfile(src_label, dst_label)
-    
+import zlib
+from utils.manifest import fingerprint_files, load_manifest, load_previous_entries, save_manifest, same_content, remove_files
+from utils.store import store_fingerprint
+
+
+CLASS_NAMES = ["steak", "salad", "soup", "cake", "tea", "empty_plate_steak", "empty_plate_salad", "empty_plate_soup", "empty_plate_cake", "cup", "empty_cup"]
+
+
+MATERIALIZE_MODES = ("copy", "hardlink", "symlink", "list")
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def create_dataset_structure(image_dir, annotation_dir, dataset_dir, incremental=False, materialize="copy",
+                             annotation_store=None):
+    if materialize not in MATERIALIZE_MODES:
+        raise ValueError(f"Неизвестный режим materialize: {materialize}, ожидается один из {MATERIALIZE_MODES}")
+    if materialize == "list" and annotation_store is not None:
+        print("Предупреждение: режим list требует .txt аннотаций рядом с изображениями, используются жёсткие ссылки")
+        materialize = "hardlink"
+    elif materialize == "list" and not _labels_next_to_images(image_dir, annotation_dir):
+        print(f"Предупреждение: {annotation_dir} не лежит рядом с {image_dir} как .../labels, "
+              f"режим list недоступен, используются жёсткие ссылки")
+        materialize = "hardlink"
+
+    os.makedirs(dataset_dir, exist_ok=True)
+    images = sorted(f for f in os.listdir(image_dir) if f.endswith(".jpg"))
+    manifest_path = os.path.join(dataset_dir, "manifest.json")
+    config = {"test_size": 0.3, "val_test_ratio": 0.5, "random_state": 42, "materialize": materialize}
+    previous = load_manifest(manifest_path, config) if incremental else {}
+
+    if previous:
+        assignments = {image: previous[image]["split"] if image in previous else _hash_split(image) for image in images}
+    else:
+        from sklearn.model_selection import train_test_split
+
+        train_images, temp_images = train_test_split(images, test_size=0.3, random_state=42)
+        val_images, test_images = train_test_split(temp_images, test_size=0.5, random_state=42)
+        assignments = {}
+        for split, split_images in (("train", train_images), ("val", val_images), ("test", test_images)):
+            assignments.update((image, split) for image in split_images)
+
+    if not previous:
+        # Полная пересборка: разбиение могло измениться, старые копии иначе остались бы в других сплитах
+        for image, entry in load_previous_entries(manifest_path).items():
+            if "split" in entry:
+                remove_files(_split_paths(dataset_dir, entry["split"], image))
+        _prune_splits(dataset_dir, {} if materialize == "list" else assignments)
+
+    if materialize == "list":
+        _write_split_lists(image_dir, dataset_dir, images, assignments)
+        save_manifest(manifest_path, config, {image: {"split": assignments[image]} for image in images})
+        print(f"Датасет создан в {dataset_dir} (списки файлов, изображения не копировались)")
+        return
+
+    sources = {}
+    for image in images:
+        sources[f"{image}:image"] = os.path.join(image_dir, image)
+        if annotation_store is None:
+            sources[f"{image}:label"] = os.path.join(annotation_dir, image.replace(".jpg", ".txt"))
+    previous_fingerprints = {}
+    for image, entry in previous.items():
+        previous_fingerprints[f"{image}:image"] = entry["image"]
+        previous_fingerprints[f"{image}:label"] = entry["label"]
+    fingerprints = fingerprint_files(sources, previous_fingerprints)
+    if annotation_store is not None:
+        fingerprints.update((f"{image}:label", store_fingerprint(annotation_store, image[:-4])) for image in images)
+
+    for split in ("train", "val", "test"):
+        os.makedirs(os.path.join(dataset_dir, split, "images"), exist_ok=True)
+        os.makedirs(os.path.join(dataset_dir, split, "labels"), exist_ok=True)
+
+    removed = [image for image in previous if image not in assignments]
+    for image in removed:
+        remove_files(_split_paths(dataset_dir, previous[image]["split"], image))
+
+    entries = {}
+    copied = 0
+    for image in images:
+        split = assignments[image]
+        image_fp = fingerprints[f"{image}:image"]
+        label_fp = fingerprints[f"{image}:label"]
+        dst_image, dst_label = _split_paths(dataset_dir, split, image)
+        entries[image] = {"split": split, "image": image_fp, "label": label_fp}
+
+        entry = previous.get(image)
+        if entry is not None and os.path.exists(dst_image):
+            image_changed = not same_content(entry["image"], image_fp)
+            label_changed = not same_content(entry["label"], label_fp) or (label_fp is not None and not os.path.exists(dst_label))
+            if not image_changed and not label_changed:
+                continue
+        else:
+            image_changed = label_changed = True
+
+        if image_changed:
+            _materialize_file(sources[f"{image}:image"], dst_image, materialize)
+        if label_changed:
+            if label_fp is not None and annotation_store is not None:
+                remove_files([dst_label])
+                annotation_store.write_yolo(image[:-4], dst_label)
+            elif label_fp is not None:
+                _materialize_file(sources[f"{image}:label"], dst_label, materialize)
+            else:
+                remove_files([dst_label])
+        copied += 1
+
+    save_manifest(manifest_path, config, entries)
+
+    _write_data_yaml(dataset_dir, {split: os.path.join(dataset_dir, f"{split}/images") for split in ("train", "val", "test")})
+
+    if incremental:
+        print(f"Обновлено изображений: {copied}, без изменений: {len(images) - copied}, удалено: {len(removed)}")
+    print(f"Датасет создан в {dataset_dir}")
+
+
+def _write_data_yaml(dataset_dir, split_sources):
     data_config = {
-        "train": os.path.join(dataset_dir, "train/images"),
-        "val": os.path.join(dataset_dir, "val/images"),
-        "test": os.path.join(dataset_dir, "test/images"),
+        "train": split_sources["train"],
+        "val": split_sources["val"],
+        "test": split_sources["test"],
         "nc": 11,
-        "names": ["steak", "salad", "soup", "cake", "tea", "empty_plate_steak", "empty_plate_salad", "empty_plate_soup", "empty_plate_cake", "cup", "empty_cup"]
+        "names": CLASS_NAMES
     }
     with open(os.path.join(dataset_dir, "data.yaml"), "w") as f:
         yaml.dump(data_config, f)
-    
-    print(f"Датасет создан в {dataset_dir}")
+
+
+def _labels_next_to_images(image_dir, annotation_dir):
+    image_dir = os.path.abspath(image_dir)
+    expected = os.path.join(os.path.dirname(image_dir), "labels")
+    return os.path.basename(image_dir) == "images" and os.path.abspath(annotation_dir) == expected
+
+
+def _write_split_lists(image_dir, dataset_dir, images, assignments):
+    image_dir = os.path.abspath(image_dir)
+    split_sources = {}
+    for split in ("train", "val", "test"):
+        list_path = os.path.join(dataset_dir, f"{split}.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for image in images:
+                if assignments[image] == split:
+                    f.write(os.path.join(image_dir, image) + "\n")
+        split_sources[split] = list_path
+    _write_data_yaml(dataset_dir, split_sources)
+
+
+def _materialize_file(src, dst, mode):
+    remove_files([dst])
+    if mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    elif mode == "symlink":
+        try:
+            os.symlink(os.path.abspath(src), dst)
+            return
+        except OSError:
+            pass
+    shutil.copyfile(src, dst)
+
+
+def _split_paths(dataset_dir, split, image):
+    return (
+        os.path.join(dataset_dir, split, "images", image),
+        os.path.join(dataset_dir, split, "labels", image.replace(".jpg", ".txt"))
+    )
+
+
+def _prune_splits(dataset_dir, assignments):
+    for split in ("train", "val", "test"):
+        for kind, suffixes in (("images", IMAGE_SUFFIXES), ("labels", (".txt",))):
+            split_dir = os.path.join(dataset_dir, split, kind)
+            if not os.path.isdir(split_dir):
+                continue
+            remove_files(
+                os.path.join(split_dir, f) for f in os.listdir(split_dir)
+                if f.lower().endswith(suffixes) and assignments.get(os.path.splitext(f)[0] + ".jpg") != split
+            )
+
+
+def _hash_split(image):
+    bucket = zlib.crc32(image.encode("utf-8")) % 100
+    if bucket < 70:
+        return "train"
+    return "val" if bucket < 85 else "test"
+
+
+def dataset_images(data_yaml, split):
+    with open(data_yaml, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+    if not data.get(split):
+        return []
+    root = data.get("path", os.path.dirname(os.path.abspath(data_yaml)))
+    sources = data[split] if isinstance(data[split], list) else [data[split]]
+
+    images = []
+    for source in sources:
+        # На Windows data.yaml содержит смешанные разделители (...\dataset\train/images),
+        # а label_path ищет каталог images по os.sep
+        source = os.path.normpath(os.path.join(root, source))
+        if source.endswith(".txt"):
+            with open(source, "r", encoding="utf-8") as f:
+                lines = [line.strip() for line in f if line.strip()]
+            images.extend(os.path.normpath(os.path.join(os.path.dirname(source), line)) for line in lines)
+        elif os.path.isdir(source):
+            images.extend(os.path.join(source, f) for f in sorted(os.listdir(source)) if f.lower().endswith(IMAGE_SUFFIXES))
+    return images
+
+
+def label_path(image):
+    image_marker = f"{os.sep}images{os.sep}"
+    image = os.path.normpath(str(image))
+    head, sep, tail = image.rpartition(image_marker)
+    path = f"{head}{os.sep}labels{os.sep}{tail}" if sep else image
+    return os.path.splitext(path)[0] + ".txt"
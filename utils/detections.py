@@ -0,0 +1,187 @@
+import json
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+
+
+def format_detections(boxes, names):
+    return [
+        {
+            "class_id": int(row[-1]),
+            "class_name": names.get(int(row[-1]), str(int(row[-1]))),
+            "confidence": round(float(row[-2]), 4),
+            "box": [round(float(v), 1) for v in row[:4]],
+            **({"track_id": int(row[4])} if len(row) == 7 else {})
+        }
+        for row in boxes
+    ]
+
+
+class JsonlDetectionSink:
+    def __init__(self, path, names):
+        self.names = names
+        self.count = 0
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, video, frame_idx, fps, boxes):
+        record = {
+            "video": str(video),
+            "frame": frame_idx,
+            "time": round(frame_idx / fps, 3) if fps else None,
+            "detections": format_detections(boxes, self.names)
+        }
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+
+class ArrowDetectionSink:
+    def __init__(self, path, names, chunk_rows=8192):
+        import pyarrow as pa
+
+        self.names = names
+        self.count = 0
+        self.chunk_rows = chunk_rows
+        self._schema = _detection_schema().with_metadata({"names": json.dumps(names, ensure_ascii=False)})
+        # Потоковый формат IPC: каждый записанный батч читается, даже если запись оборвалась до close()
+        self._writer = pa.ipc.new_stream(str(path), self._schema)
+        self._pending = []
+        self._pending_rows = 0
+
+    def write(self, video, frame_idx, fps, boxes):
+        self.count += 1
+        if not len(boxes):
+            return
+        self._pending.append((str(video), frame_idx, frame_idx / fps if fps else float("nan"), boxes))
+        self._pending_rows += len(boxes)
+        if self._pending_rows >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        import pyarrow as pa
+
+        counts = [len(boxes) for _, _, _, boxes in self._pending]
+        boxes = np.concatenate([boxes.astype(np.float32) for _, _, _, boxes in self._pending])
+        track_ids = boxes[:, 4] if boxes.shape[1] == 7 else np.full(len(boxes), -1)
+        columns = {
+            "video": np.repeat([video for video, _, _, _ in self._pending], counts),
+            "frame": np.repeat([frame for _, frame, _, _ in self._pending], counts).astype(np.int32),
+            "time": np.repeat([time for _, _, time, _ in self._pending], counts).astype(np.float64),
+            "class": boxes[:, -1].astype(np.int16),
+            "confidence": boxes[:, -2],
+            "x1": boxes[:, 0],
+            "y1": boxes[:, 1],
+            "x2": boxes[:, 2],
+            "y2": boxes[:, 3],
+            "track_id": track_ids.astype(np.int32)
+        }
+        self._writer.write_batch(pa.record_batch([columns[name] for name in self._schema.names], schema=self._schema))
+        self._pending = []
+        self._pending_rows = 0
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+
+def open_detection_sink(path, names):
+    if Path(path).suffix in (".arrow", ".arrows"):
+        return ArrowDetectionSink(path, names)
+    return JsonlDetectionSink(path, names)
+
+
+def load_detections(paths):
+    import pyarrow as pa
+
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    # memory_map + open_stream дают таблицу без копирования: столбцы ссылаются прямо на страницы файла
+    tables = [pa.ipc.open_stream(pa.memory_map(str(path))).read_all() for path in paths]
+    return pa.concat_tables(tables) if len(tables) > 1 else tables[0]
+
+
+def detection_names(table):
+    metadata = table.schema.metadata or {}
+    return {int(k): v for k, v in json.loads(metadata.get(b"names", b"{}")).items()}
+
+
+def class_counts(table, window_s=60.0):
+    df = table.select(["video", "frame", "time", "class"]).to_pandas()
+    df["window_start"] = np.floor(df["time"].to_numpy() / window_s) * window_s
+    per_frame = df.groupby(["video", "window_start", "frame", "class"], sort=False).size().rename("count").reset_index()
+    counts = per_frame.groupby(["video", "window_start", "class"]).agg(
+        detections=("count", "sum"),
+        max_per_frame=("count", "max"),
+        frames_present=("frame", "nunique")
+    ).reset_index()
+    counts.insert(3, "class_name", counts["class"].map(detection_names(table)))
+    return counts
+
+
+def dwell_times(table, gap_s=2.0):
+    df = table.select(["video", "time", "class", "track_id"]).to_pandas()
+    names = detection_names(table)
+
+    if (df["track_id"] >= 0).any():
+        df = df[df["track_id"] >= 0].sort_values(["video", "track_id", "time"])
+        dwell = df.groupby(["video", "track_id"]).agg(
+            start=("time", "min"), end=("time", "max"), **{"class": ("class", "last")}
+        ).reset_index()
+    else:
+        df = df.drop_duplicates(["video", "class", "time"]).sort_values(["video", "class", "time"])
+        # Новый отрезок присутствия начинается при смене видео/класса или разрыве дольше gap_s
+        new_segment = (
+            (df["video"] != df["video"].shift()) | (df["class"] != df["class"].shift())
+            | (df["time"].diff() > gap_s)
+        )
+        dwell = df.groupby(new_segment.cumsum().to_numpy()).agg(
+            video=("video", "first"), start=("time", "min"), end=("time", "max"), **{"class": ("class", "first")}
+        ).reset_index(drop=True)
+        dwell["track_id"] = -1
+
+    dwell["class_name"] = dwell["class"].map(names)
+    dwell["dwell_s"] = dwell["end"] - dwell["start"]
+    return dwell[["video", "track_id", "class", "class_name", "start", "end", "dwell_s"]]
+
+
+def _detection_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("video", pa.string()),
+        ("frame", pa.int32()),
+        ("time", pa.float64()),
+        ("class", pa.int16()),
+        ("confidence", pa.float32()),
+        ("x1", pa.float32()),
+        ("y1", pa.float32()),
+        ("x2", pa.float32()),
+        ("y2", pa.float32()),
+        ("track_id", pa.int32())
+    ])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Аналитика по сохранённым детекциям (Arrow IPC)")
+    parser.add_argument("paths", nargs="+", help="файлы .arrows, записанные create_inference_video")
+    parser.add_argument("--window", type=float, default=60.0, help="окно подсчёта классов, с")
+    parser.add_argument("--gap", type=float, default=2.0, help="разрыв, после которого присутствие прерывается, с")
+    parser.add_argument("--output", default=None, help="префикс CSV для сохранения таблиц")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = load_detections(args.paths)
+    counts = class_counts(table, args.window)
+    dwell = dwell_times(table, args.gap)
+    print(f"Детекций: {table.num_rows}, запрос выполнен за {(time.perf_counter() - start) * 1000:.0f} мс")
+    print(counts.groupby("class_name")[["detections", "max_per_frame"]].max().to_string())
+    print(dwell.groupby("class_name")["dwell_s"].describe()[["count", "mean", "max"]].to_string())
+    if args.output:
+        counts.to_csv(f"{args.output}_counts.csv", index=False)
+        dwell.to_csv(f"{args.output}_dwell.csv", index=False)
+        print(f"Таблицы сохранены в {args.output}_counts.csv и {args.output}_dwell.csv")
@@ -0,0 +1,121 @@
+import time
+import cv2
+import numpy as np
+from utils.dataset import CLASS_NAMES, dataset_images, label_path
+from utils.store import read_yolo_file
+
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+
+def evaluate_backend(backend, data_yaml, split="test", batch_size=1, max_images=None):
+    images = dataset_images(data_yaml, split)[:max_images]
+    stats = []
+    inference_time = 0.0
+    missing_labels = 0
+
+    for start in range(0, len(images), batch_size):
+        paths = images[start:start + batch_size]
+        frames = [cv2.imread(path) for path in paths]
+        begin = time.perf_counter()
+        detections = backend.predict(frames)
+        inference_time += time.perf_counter() - begin
+
+        for path, frame, predicted in zip(paths, frames, detections):
+            gt_classes, gt_boxes = _ground_truth(path, frame.shape[:2])
+            if gt_classes is None:
+                missing_labels += 1
+                gt_classes, gt_boxes = np.zeros(0, dtype=np.int64), np.zeros((0, 4))
+            stats.append(_match_predictions(predicted, gt_classes, gt_boxes))
+
+    map50, map50_95 = _mean_average_precision(stats, len(CLASS_NAMES))
+    return {
+        "split": split,
+        "images": len(images),
+        "gt_boxes": sum(len(gt_classes) for *_, gt_classes in stats),
+        "missing_labels": missing_labels,
+        "map50": map50,
+        "map50_95": map50_95,
+        "ms_per_image": 1000 * inference_time / max(len(images), 1)
+    }
+
+
+def box_iou(a, b):
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(rb - lt, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def _ground_truth(image_path, shape):
+    try:
+        classes, boxes = read_yolo_file(label_path(image_path))
+    except FileNotFoundError:
+        return None, None
+    h, w = shape
+    xyxy = np.empty_like(boxes, dtype=np.float64)
+    xyxy[:, 0] = (boxes[:, 0] - boxes[:, 2] / 2) * w
+    xyxy[:, 1] = (boxes[:, 1] - boxes[:, 3] / 2) * h
+    xyxy[:, 2] = (boxes[:, 0] + boxes[:, 2] / 2) * w
+    xyxy[:, 3] = (boxes[:, 1] + boxes[:, 3] / 2) * h
+    return classes.astype(np.int64), xyxy
+
+
+def _match_predictions(predicted, gt_classes, gt_boxes):
+    correct = np.zeros((len(predicted), len(IOU_THRESHOLDS)), dtype=bool)
+    if len(predicted) and len(gt_classes):
+        iou = box_iou(gt_boxes, predicted[:, :4])
+        iou = iou * (gt_classes[:, None] == predicted[None, :, 5])
+        for k, threshold in enumerate(IOU_THRESHOLDS):
+            gt_idx, pred_idx = np.nonzero(iou >= threshold)
+            if not len(gt_idx):
+                continue
+            order = np.argsort(-iou[gt_idx, pred_idx])
+            gt_idx, pred_idx = gt_idx[order], pred_idx[order]
+            _, first_pred = np.unique(pred_idx, return_index=True)
+            gt_idx, pred_idx = gt_idx[first_pred], pred_idx[first_pred]
+            order = np.argsort(-iou[gt_idx, pred_idx])
+            _, first_gt = np.unique(gt_idx[order], return_index=True)
+            correct[pred_idx[order][first_gt], k] = True
+    return correct, predicted[:, 4], predicted[:, 5].astype(np.int64), gt_classes
+
+
+def _mean_average_precision(stats, num_classes):
+    if not stats:
+        return 0.0, 0.0
+    correct = np.concatenate([s[0] for s in stats])
+    confidences = np.concatenate([s[1] for s in stats])
+    pred_classes = np.concatenate([s[2] for s in stats])
+    gt_classes = np.concatenate([s[3] for s in stats])
+
+    order = np.argsort(-confidences)
+    correct, pred_classes = correct[order], pred_classes[order]
+    ap = []
+    for cls in range(num_classes):
+        n_gt = np.count_nonzero(gt_classes == cls)
+        if n_gt == 0:
+            continue
+        hits = correct[pred_classes == cls]
+        if not len(hits):
+            # Нет предсказаний класса - AP 0 (иначе интерполяция кривой даёт 0.5)
+            ap.append([0.0] * len(IOU_THRESHOLDS))
+            continue
+        tp = np.cumsum(hits, axis=0)
+        fp = np.cumsum(~hits, axis=0)
+        recall = tp / n_gt
+        precision = tp / np.maximum(tp + fp, 1e-9)
+        ap.append([_average_precision(recall[:, k], precision[:, k]) for k in range(len(IOU_THRESHOLDS))])
+    if not ap:
+        return 0.0, 0.0
+    ap = np.array(ap)
+    return float(ap[:, 0].mean()), float(ap.mean())
+
+
+def _average_precision(recall, precision):
+    mrec = np.concatenate([[0.0], recall, [1.0]])
+    mpre = np.concatenate([[1.0], precision, [0.0]])
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    return float(np.trapezoid(np.interp(x, mrec, mpre), x))
@@ -1,31 +1,83 @@
 import os
 import cv2
+from collections import deque
 from pathlib import Path
-from sklearn.model_selection import train_test_split
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from utils import profiling
+from utils.motion import thumbnail, frame_change
 
 
-def extract_frames(video_paths, output_dir, frame_interval=3):
+def extract_frames(video_paths, output_dir, frame_interval=3, workers=None, writer_threads=4,
+                   keyframes=False, change_threshold=0.01, max_gap=90):
     os.makedirs(output_dir, exist_ok=True)
-    total_frames = 0
-    
-    for video_path in video_paths:
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            print(f"Ошибка: Не удалось открыть {video_path}")
-            continue
-        count = 0
-        video_name = Path(video_path).stem
-        
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
+    if workers is None:
+        workers = min(len(video_paths), os.cpu_count() or 1) or 1
+
+    keyframe_params = (change_threshold, max_gap) if keyframes else None
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_extract_video, str(video_path), str(output_dir), frame_interval, writer_threads,
+                            keyframe_params)
+            for video_path in video_paths
+        ]
+        total_frames = 0
+        for future in futures:
+            saved, profile = future.result()
+            total_frames += saved
+            profiling.merge(profile)
+
+    print(f"Извлечено {total_frames} кадров в {output_dir}")
+    return total_frames
+
+
+def _extract_video(video_path, output_dir, frame_interval, writer_threads, keyframe_params=None):
+    cv2.setNumThreads(1)
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"Ошибка: Не удалось открыть {video_path}")
+        return 0, profiling.collect()
+    count = 0
+    saved = 0
+    video_name = Path(video_path).stem
+    pending = deque()
+    last_thumb = None
+    last_kept = None
+
+    with ThreadPoolExecutor(max_workers=writer_threads) as writer:
+        while True:
             if count % frame_interval == 0:
+                with profiling.timer("decode"):
+                    ret, frame = cap.read()
+                if not ret:
+                    break
+                if keyframe_params is not None:
+                    change_threshold, max_gap = keyframe_params
+                    thumb = thumbnail(frame)
+                    if (last_thumb is not None and count - last_kept < max_gap
+                            and frame_change(last_thumb, thumb) < change_threshold):
+                        profiling.count("keyframes_skipped")
+                        count += 1
+                        continue
+                    last_thumb = thumb
+                    last_kept = count
                 frame_path = os.path.join(output_dir, f"{video_name}_frame_{count:05d}.jpg")
-                cv2.imwrite(frame_path, frame)
-                total_frames += 1
+                pending.append(writer.submit(_write_frame, frame_path, frame))
+                saved += 1
+                if len(pending) > writer_threads * 4:
+                    pending.popleft().result()
+            else:
+                with profiling.timer("grab"):
+                    grabbed = cap.grab()
+                if not grabbed:
+                    break
             count += 1
-        cap.release()
-    
-    print(f"Извлечено {total_frames} кадров в {output_dir}")
-    return total_frames
+        for future in pending:
+            future.result()
+    cap.release()
+    profiling.count("frames_saved", saved)
+    return saved, profiling.collect()
+
+
+def _write_frame(frame_path, frame):
+    with profiling.timer("imwrite"):
+        return cv2.imwrite(frame_path, frame)
@@ -1,51 +1,112 @@
+import os
+import json
+import multiprocessing as mp
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
+from utils.manifest import config_hash
 
 
+METRICS_CACHE_VERSION = 1
+METRIC_COLUMNS = {
+    "train_loss": "train/box_loss",
+    "val_loss": "val/box_loss",
+    "mAP50": "metrics/mAP50(B)",
+    "mAP50_95": "metrics/mAP50-95(B)",
+    "precision": "metrics/precision(B)",
+    "recall": "metrics/recall(B)"
+}
 
-def plot_yolo_metrics(base_dir, output_dir="plots", experiments_to_compare=None):
+
+def load_experiment_metrics(base_dir, cache_path=None):
     base_dir = Path(base_dir)
+    cache_path = base_dir / ".metrics_cache.json" if cache_path is None else Path(cache_path)
+    cached = {}
+    if cache_path.exists():
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("version") == METRICS_CACHE_VERSION:
+            cached = cache["experiments"]
+
+    experiments = {}
+    reloaded = 0
+    for experiment in sorted(base_dir.glob("*")):
+        if not experiment.is_dir() or "weights" in experiment.name:
+            continue
+        results_file = experiment / "results.csv"
+        if not results_file.exists():
+            print(f"Предупреждение: Файл {results_file} не найден")
+            continue
+        stat = results_file.stat()
+        entry = cached.get(experiment.name)
+        if entry is None or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "columns": _read_results(results_file)}
+            reloaded += 1
+        experiments[experiment.name] = entry
+
+    if reloaded or set(experiments) != set(cached):
+        tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": METRICS_CACHE_VERSION, "experiments": experiments}, f)
+        os.replace(tmp_path, cache_path)
+    print(f"Экспериментов: {len(experiments)}, перечитано results.csv: {reloaded}")
+
+    return {
+        name: {key: np.asarray(values) for key, values in entry["columns"].items()}
+        for name, entry in experiments.items()
+    }
+
+
+def plot_yolo_metrics(base_dir, output_dir="plots", experiments_to_compare=None, workers=None):
     output_dir = Path(output_dir)
-    output_dir.mkdir(exist_ok=True)
-    
-    experiment_data = {}
-    
-    for experiment in base_dir.glob("*"):
-        if experiment.is_dir() and "weights" not in experiment.name:
-            results_file = experiment / "results.csv"
-            
-            if results_file.exists():
-                print(f"Обрабатываю эксперимент: {experiment.name}")
-                df = pd.read_csv(results_file)
-                
-                experiment_data[experiment.name] = {
-                    "epochs": df["epoch"].values if "epoch" in df.columns else np.arange(len(df)),
-                    "train_loss": df.get("train/box_loss", np.zeros(len(df))),
-                    "val_loss": df.get("val/box_loss", np.zeros(len(df))),
-                    "mAP50": df.get("metrics/mAP50(B)", np.zeros(len(df))),
-                    "mAP50_95": df.get("metrics/mAP50-95(B)", np.zeros(len(df))),
-                    "precision": df.get("metrics/precision(B)", np.zeros(len(df))),
-                    "recall": df.get("metrics/recall(B)", np.zeros(len(df)))
-                }
-            else:
-                print(f"Предупреждение: Файл {results_file} не найден")
-    
-    if not experiment_data:
-        print("Ошибка: Не найдено данных для построения графиков")
-        return
-    
+    output_dir.mkdir(parents=True, exist_ok=True)
 
+    experiment_data = load_experiment_metrics(base_dir)
     if experiments_to_compare:
         experiment_data = {k: v for k, v in experiment_data.items() if k in experiments_to_compare}
-    
-    _plot_loss_curves(experiment_data, output_dir)
-    _plot_map_metrics(experiment_data, output_dir)
-    _plot_prf_metrics(experiment_data, output_dir)
-    _plot_comparison_summary(experiment_data, output_dir)
-    
+    if not experiment_data:
+        print("Ошибка: Не найдено данных для построения графиков")
+        return None
+
+    figures = {
+        "loss_curves.png": _plot_loss_curves,
+        "map_metrics.png": _plot_map_metrics,
+        "precision_recall_f1.png": _plot_prf_metrics,
+        "experiments_comparison.png": _plot_comparison_summary
+    }
+    signature = config_hash({name: {k: v.tolist() for k, v in data.items()} for name, data in experiment_data.items()})
+    signature_path = output_dir / ".figures.json"
+    if signature_path.exists() and all((output_dir / name).exists() for name in figures):
+        with open(signature_path, "r", encoding="utf-8") as f:
+            if json.load(f).get("signature") == signature:
+                print(f"Метрики не изменились, графики в {output_dir} актуальны")
+                return experiment_data
+
+    # Фигуры независимы, поэтому рендерятся в отдельных процессах: matplotlib не потокобезопасен
+    # spawn: этап plot идёт в пайплайне параллельно с инференсом, а fork из многопоточного процесса может зависнуть
+    with ProcessPoolExecutor(max_workers=workers or min(len(figures), os.cpu_count() or 1),
+                             mp_context=mp.get_context("spawn")) as executor:
+        futures = [executor.submit(plot, experiment_data, output_dir) for plot in figures.values()]
+        for future in futures:
+            future.result()
+    with open(signature_path, "w", encoding="utf-8") as f:
+        json.dump({"signature": signature}, f)
+
     print(f"Все графики сохранены в {output_dir}")
+    return experiment_data
+
+
+def _read_results(results_file):
+    df = pd.read_csv(results_file)
+    df.columns = df.columns.str.strip()
+    columns = {"epochs": (df["epoch"] if "epoch" in df.columns else pd.Series(np.arange(len(df)))).tolist()}
+    for key, column in METRIC_COLUMNS.items():
+        columns[key] = df[column].tolist() if column in df.columns else [0.0] * len(df)
+    return columns
 
 
 def _plot_loss_curves(experiment_data, output_dir):
@@ -188,6 +249,7 @@ def _plot_comparison_summary(experiment_data, output_dir):
 
 def generate_metrics_report(experiment_data, output_dir):
     output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
     
     with open(output_dir / "metrics_report.txt", "w", encoding="utf-8") as f:
         f.write("ОТЧЁТ ПО МЕТРИКАМ YOLOV11\n")
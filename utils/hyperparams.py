@@ -1,11 +1,12 @@
-from ultralytics import YOLO
+from utils.runcache import cached_train
 
 
 def optimize_hyperparameters(dataset_yaml, experiment_name, experiment_dir, iteration=1):
-    model_default = YOLO("../yolo11s.pt")
-    model_upgrade = YOLO(experiment_dir / "baseline9/weights/best.pt")
+    model_default = "../yolo11s.pt"
+    model_upgrade = experiment_dir / "baseline9/weights/best.pt"
     if iteration == 1:
-        results = model_default.train(
+        results = cached_train(
+            model_default,
             data=dataset_yaml,
             epochs=100,
             batch=4,
@@ -38,7 +39,8 @@ def optimize_hyperparameters(dataset_yaml, experiment_name, experiment_dir, iter
             val=True
         )
     elif iteration == 2:
-        results = model_default.train(
+        results = cached_train(
+            model_default,
             data=dataset_yaml,
             epochs=100,
             batch=4,
@@ -71,7 +73,8 @@ def optimize_hyperparameters(dataset_yaml, experiment_name, experiment_dir, iter
             val=True
         )
     elif iteration == 3:
-        results = model_upgrade.train(
+        results = cached_train(
+            model_upgrade,
             data=dataset_yaml,
             epochs=100,
             batch=4,
@@ -104,7 +107,8 @@ def optimize_hyperparameters(dataset_yaml, experiment_name, experiment_dir, iter
             val=True
         )
     elif iteration == 4:
-        results = model_upgrade.train(
+        results = cached_train(
+            model_upgrade,
             data=dataset_yaml,
             epochs=100,
             batch=4,
@@ -0,0 +1,75 @@
+import os
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+
+MANIFEST_VERSION = 1
+
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def config_hash(config):
+    data = json.dumps(config, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def file_fingerprint(path, previous=None):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if previous and previous["size"] == st.st_size and previous["mtime_ns"] == st.st_mtime_ns:
+        return previous
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": file_hash(path)}
+
+
+def fingerprint_files(paths, previous, workers=8):
+    previous = previous or {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        fingerprints = executor.map(lambda key: file_fingerprint(paths[key], previous.get(key)), paths)
+        return dict(zip(paths, fingerprints))
+
+
+def same_content(a, b):
+    if a is None or b is None:
+        return a is b
+    return a["hash"] == b["hash"]
+
+
+def load_manifest(path, config):
+    manifest = _read_manifest(path)
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("config") != config_hash(config):
+        return {}
+    return manifest["entries"]
+
+
+def load_previous_entries(path):
+    # Записи прошлой сборки без проверки конфига: при полной пересборке по ним удаляются её выходы
+    return _read_manifest(path).get("entries", {})
+
+
+def _read_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path, config, entries):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "config": config_hash(config), "entries": entries}, f)
+    os.replace(tmp_path, path)
+
+
+def remove_files(paths):
+    for path in paths:
+        if os.path.lexists(path):
+            os.remove(path)
@@ -0,0 +1,41 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+MAX_MODELS = int(os.environ.get("PIPELINE_MAX_MODELS", "2"))
+
+_models = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_model(model_path, backend="torch", imgsz=640, conf=0.5, iou=0.7, num_threads=None):
+    from utils.backends import load_backend
+
+    model_path = Path(model_path).resolve()
+    # mtime_ns в ключе: переобученные веса с тем же путём загружаются заново
+    key = (str(model_path), model_path.stat().st_mtime_ns, backend, imgsz, conf, iou, num_threads)
+    with _lock:
+        if key in _models:
+            _models.move_to_end(key)
+            return _models[key]
+        # Загрузка под блокировкой: параллельные вызовы не загружают одну модель дважды
+        for stale in [k for k in _models if k[0] == key[0] and k[1] != key[1]]:
+            del _models[stale]
+        model = load_backend(model_path, backend, imgsz=imgsz, conf=conf, iou=iou, num_threads=num_threads)
+        _models[key] = model
+        while len(_models) > MAX_MODELS:
+            evicted, _ = _models.popitem(last=False)
+            print(f"Модель {evicted[0]} ({evicted[2]}) выгружена из кэша")
+        return model
+
+
+def cached_models():
+    with _lock:
+        return [(path, backend) for path, _, backend, *_ in _models]
+
+
+def clear():
+    with _lock:
+        _models.clear()
@@ -0,0 +1,222 @@
+import os
+import html
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import numpy as np
+from utils.sweep import MAP_COLUMN
+
+
+LOSS_COLUMNS = ("train/box_loss", "val/box_loss")
+
+
+class CsvTail:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.offset = 0
+        self.header = None
+        self._partial = b""
+
+    def read_new(self):
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return [], False
+        reset = size < self.offset
+        if reset:
+            # Файл перезаписан (запуск начат заново) - читаем с начала
+            self.offset = 0
+            self.header = None
+            self._partial = b""
+        if size == self.offset:
+            return [], reset
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        self.offset += len(chunk)
+        lines = (self._partial + chunk).split(b"\n")
+        self._partial = lines.pop()
+
+        rows = []
+        for line in lines:
+            values = [value.strip() for value in line.decode("utf-8").split(",")]
+            if not any(values):
+                continue
+            if self.header is None:
+                self.header = values
+                continue
+            row = {}
+            for name, value in zip(self.header, values):
+                try:
+                    row[name] = float(value)
+                except ValueError:
+                    pass
+            rows.append(row)
+        return rows, reset
+
+
+class RunState:
+    def __init__(self, name, results_csv):
+        self.name = name
+        self.tail = CsvTail(results_csv)
+        self.maps = []
+        self.losses = {column: [] for column in LOSS_COLUMNS}
+        self.best_map = None
+        self.best_epoch = None
+
+    def update(self):
+        rows, reset = self.tail.read_new()
+        if reset:
+            # Перезапуск обучения: история прошлого запуска не должна влиять на лучший mAP и плато
+            self.maps = []
+            self.losses = {column: [] for column in LOSS_COLUMNS}
+            self.best_map = None
+            self.best_epoch = None
+        for row in rows:
+            value = row.get(MAP_COLUMN)
+            if value is None:
+                continue
+            self.maps.append(value)
+            if self.best_map is None or value > self.best_map:
+                self.best_map = value
+                self.best_epoch = len(self.maps)
+            for column in LOSS_COLUMNS:
+                self.losses[column].append(row.get(column, np.nan))
+        return len(rows)
+
+    def summary(self, window, patience, min_delta, stale_after):
+        epochs = len(self.maps)
+        since_best = epochs - self.best_epoch if self.best_epoch is not None else 0
+        map_slope = _slope(self.maps, window)
+        plateau = epochs >= window and (
+            since_best >= patience or (map_slope is not None and abs(map_slope) * window < min_delta)
+        )
+        modified = self.tail.path.stat().st_mtime if self.tail.path.exists() else 0
+        return {
+            "name": self.name,
+            "epochs": epochs,
+            "map50_95": self.maps[-1] if self.maps else None,
+            "best_map50_95": self.best_map,
+            "best_epoch": self.best_epoch,
+            "epochs_since_best": since_best,
+            "map_slope": map_slope,
+            "loss_slopes": {column: _slope(values, window) for column, values in self.losses.items()},
+            "running": time.time() - modified < stale_after,
+            "plateau": plateau
+        }
+
+
+class TrainingMonitor:
+    def __init__(self, roots, window=10, patience=15, min_delta=0.002, stale_after=900):
+        self.roots = [Path(root) for root in roots]
+        self.window = window
+        self.patience = patience
+        self.min_delta = min_delta
+        self.stale_after = stale_after
+        self.runs = {}
+        self._lock = threading.Lock()
+
+    def poll(self):
+        found = [results_csv for root in self.roots for results_csv in root.glob("*/results.csv")]
+        with self._lock:
+            for results_csv in found:
+                if results_csv.parent.name not in self.runs:
+                    self.runs[results_csv.parent.name] = RunState(results_csv.parent.name, results_csv)
+            return sum(run.update() for run in self.runs.values())
+
+    def snapshot(self):
+        with self._lock:
+            runs = [run.summary(self.window, self.patience, self.min_delta, self.stale_after)
+                    for run in self.runs.values()]
+        runs.sort(key=lambda r: -1 if r["best_map50_95"] is None else r["best_map50_95"], reverse=True)
+        return {"updated": time.strftime("%Y-%m-%d %H:%M:%S"), "runs": runs}
+
+    def serve(self, host="127.0.0.1", port=8765, interval=30):
+        def poll_forever():
+            while True:
+                new_rows = self.poll()
+                for run in self.snapshot()["runs"]:
+                    if new_rows and run["running"] and run["plateau"]:
+                        print(f"Плато: {run['name']} - лучший mAP50-95 {run['best_map50_95']:.4f} "
+                              f"на эпохе {run['best_epoch']}, без улучшения {run['epochs_since_best']} эпох")
+                time.sleep(interval)
+
+        threading.Thread(target=poll_forever, daemon=True).start()
+        server = ThreadingHTTPServer((host, port), _make_handler(self, interval))
+        print(f"Монитор обучения: http://{host}:{port}/ (JSON: /metrics.json)")
+        server.serve_forever()
+
+
+def _slope(values, window):
+    values = np.asarray(values[-window:], dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if len(values) < 2:
+        return None
+    return float(np.polyfit(np.arange(len(values)), values, 1)[0])
+
+
+def _render_html(snapshot, interval):
+    def fmt(value, digits=4):
+        return "-" if value is None else f"{value:.{digits}f}"
+
+    rows = []
+    for run in snapshot["runs"]:
+        style = ' style="background:#ffe0e0"' if run["plateau"] else ""
+        rows.append(
+            f"<tr{style}><td>{html.escape(run['name'])}</td><td>{run['epochs']}</td>"
+            f"<td>{fmt(run['map50_95'])}</td><td>{fmt(run['best_map50_95'])} ({run['best_epoch'] or '-'})</td>"
+            f"<td>{fmt(run['map_slope'], 5)}</td><td>{fmt(run['loss_slopes']['train/box_loss'], 5)}</td>"
+            f"<td>{fmt(run['loss_slopes']['val/box_loss'], 5)}</td>"
+            f"<td>{'идёт' if run['running'] else 'остановлен'}</td><td>{'плато' if run['plateau'] else ''}</td></tr>"
+        )
+    return (
+        f'<html><head><meta charset="utf-8"><meta http-equiv="refresh" content="{interval}">'
+        "<title>Монитор обучения</title></head><body>"
+        f"<h3>Монитор обучения - {snapshot['updated']}</h3>"
+        '<table border="1" cellpadding="4" cellspacing="0"><tr><th>Запуск</th><th>Эпох</th><th>mAP50-95</th>'
+        "<th>Лучший (эпоха)</th><th>Наклон mAP</th><th>Наклон train loss</th><th>Наклон val loss</th>"
+        "<th>Статус</th><th></th></tr>" + "".join(rows) + "</table></body></html>"
+    )
+
+
+def _make_handler(monitor, interval):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            snapshot = monitor.snapshot()
+            if self.path.startswith("/metrics.json"):
+                body = json.dumps(snapshot, ensure_ascii=False).encode("utf-8")
+                content_type = "application/json"
+            elif self.path in ("/", "/index.html"):
+                body = _render_html(snapshot, interval).encode("utf-8")
+                content_type = "text/html; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Мониторинг идущих обучений по results.csv")
+    parser.add_argument("roots", nargs="*", default=[os.path.join("annotations", "experiments")],
+                        help="каталоги с запусками (project ultralytics)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=int, default=30, help="период опроса, с")
+    parser.add_argument("--window", type=int, default=10, help="окно эпох для наклонов")
+    parser.add_argument("--patience", type=int, default=15, help="эпох без улучшения до флага плато")
+    parser.add_argument("--min-delta", type=float, default=0.002, help="минимальный прирост mAP50-95 за окно")
+    args = parser.parse_args()
+    TrainingMonitor(args.roots, args.window, args.patience, args.min_delta).serve(args.host, args.port, args.interval)
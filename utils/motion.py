@@ -0,0 +1,44 @@
+import cv2
+import numpy as np
+
+
+def thumbnail(frame, size=(160, 90)):
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+    return cv2.GaussianBlur(small, (5, 5), 0)
+
+
+def frame_change(prev_thumb, thumb, pixel_delta=25):
+    diff = cv2.absdiff(prev_thumb, thumb)
+    return np.count_nonzero(diff > pixel_delta) / diff.size
+
+
+class MotionGate:
+    def __init__(self, threshold=0.01, refresh_interval=30, pixel_delta=25):
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+        self.pixel_delta = pixel_delta
+        self.frames = 0
+        self.skipped = 0
+        self.reset()
+
+    def reset(self):
+        self.reference = None
+        self.since_inference = 0
+
+    def should_infer(self, frame):
+        self.frames += 1
+        thumb = thumbnail(frame)
+        if (self.reference is not None and self.since_inference < self.refresh_interval
+                and frame_change(self.reference, thumb, self.pixel_delta) < self.threshold):
+            self.since_inference += 1
+            self.skipped += 1
+            return False
+        # Сравниваем всегда с последним кадром, ушедшим в модель, чтобы медленный дрейф не накапливался незамеченным
+        self.reference = thumb
+        self.since_inference = 1
+        return True
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.frames if self.frames else 0.0
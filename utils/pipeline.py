@@ -0,0 +1,284 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+import yaml
+from utils.manifest import config_hash
+
+
+STAMP_DIR = ".pipeline"
+
+
+class Stage:
+    def __init__(self, name, run, after=(), inputs=(), outputs=(), resource=None):
+        self.name = name
+        self.run = run
+        self.after = tuple(after)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.resource = resource
+
+
+def load_pipeline_config(config_path):
+    config_path = Path(config_path).resolve()
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    base_dir = config_path.parent
+
+    paths = {}
+    for key, value in config["paths"].items():
+        if isinstance(value, list):
+            paths[key] = [p for pattern in value
+                          for p in (_expand(base_dir / pattern) if glob.has_magic(pattern) else [base_dir / pattern])]
+        else:
+            paths[key] = base_dir / value
+    config["paths"] = paths
+    config["base_dir"] = base_dir
+    config.setdefault("workers", 2)
+    config["stages"] = {name: dict(params or {}) for name, params in config.get("stages", {}).items()}
+    return config
+
+
+def build_stages(config):
+    paths = config["paths"]
+    params = config["stages"]
+    base_dir = config["base_dir"]
+    data_yaml = paths["dataset"] / "data.yaml"
+    # Необязательное хранилище аннотаций (utils.store или propagate --store) заменяет .txt при аугментации
+    labels = paths.get("annotation_store", paths["annotations"])
+    sweep_config = base_dir / params.get("sweep", {}).get("config", "sweep.yaml")
+
+    stages = [
+        Stage("extract", lambda p: _run_extract(paths, p),
+              inputs=paths["videos"], outputs=[paths["frames"]]),
+        Stage("check", lambda p: _run_check(paths, p), after=["extract"],
+              inputs=[paths["frames"], paths["annotations"]], outputs=[paths["annotation_report"]]),
+        Stage("augment", lambda p: _run_augment(paths, p), after=["check"],
+              inputs=[paths["frames"], labels],
+              outputs=[paths["augmented_images"], paths["augmented_labels"]]),
+        Stage("dataset", lambda p: _run_dataset(paths, p), after=["augment"],
+              inputs=[paths["augmented_images"], paths["augmented_labels"]], outputs=[data_yaml]),
+        Stage("train", lambda p: _run_train(paths, p), after=["dataset"],
+              inputs=[data_yaml], resource="gpu"),
+        Stage("sweep", lambda p: _run_sweep(sweep_config), after=["dataset"],
+              inputs=[data_yaml, sweep_config], resource="gpu"),
+        Stage("plot", lambda p: _run_plot(paths), after=["train", "sweep"],
+              inputs=[paths["experiments"] / "*" / "results.csv"], outputs=[paths["plots"] / "metrics_report.txt"]),
+        Stage("inference", lambda p: _run_inference(paths, p, base_dir), after=["train"],
+              inputs=[paths["model"], *paths["videos"]], outputs=[paths["inference_video"]])
+    ]
+    return {stage.name: stage for stage in stages}
+
+
+def run_pipeline(config_path, targets=None, force=False, dry_run=False):
+    config = load_pipeline_config(config_path)
+    stages = build_stages(config)
+    stamp_dir = config["base_dir"] / STAMP_DIR
+    stamp_dir.mkdir(exist_ok=True)
+
+    enabled = {name for name in stages if config["stages"].get(name, {}).get("enabled", True)}
+    selected = _select(stages, targets or list(stages), enabled)
+    # Зависимости от выключенных или невыбранных этапов считаются выполненными
+    pending = {name: {dep for dep in stages[name].after if dep in selected} for name in selected}
+    status = {}
+    start = time.perf_counter()
+    print(f"Пайплайн {config_path}: этапы {', '.join(_ordered(stages, selected))}")
+
+    with ThreadPoolExecutor(max_workers=config["workers"]) as executor:
+        running = {}
+        while pending or running:
+            busy = {stages[name].resource for name in running.values()} - {None}
+            for name in _ordered(stages, list(pending)):
+                deps = pending[name]
+                if any(status.get(dep) in ("failed", "blocked") for dep in deps):
+                    status[name] = "blocked"
+                    del pending[name]
+                    print(f"[{name}] пропущен: не выполнена зависимость")
+                    continue
+                if not all(dep in status for dep in deps) or stages[name].resource in busy:
+                    continue
+                stage_params = {k: v for k, v in config["stages"].get(name, {}).items() if k != "enabled"}
+                signature = config_hash({"params": stage_params, "paths": _stage_paths(stages[name])})
+                stamp = stamp_dir / f"{name}.json"
+                # В пробном прогоне зависимость не выполняется, и её выходы не обновляются - сверка со штампом
+                # показала бы «актуален» для этапа, который в настоящем запуске пойдёт следом
+                upstream_changed = any(status.get(dep) == "would-run" for dep in deps)
+                if not force and not upstream_changed and _up_to_date(stages[name], stamp, signature):
+                    status[name] = "up-to-date"
+                    del pending[name]
+                    print(f"[{name}] актуален")
+                    continue
+                del pending[name]
+                if dry_run:
+                    status[name] = "would-run"
+                    print(f"[{name}] будет выполнен")
+                    continue
+                print(f"[{name}] запуск")
+                future = executor.submit(_execute, stages[name], stage_params, stamp, signature)
+                running[future] = name
+                if stages[name].resource is not None:
+                    busy.add(stages[name].resource)
+
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                elapsed, error = future.result()
+                status[name] = "failed" if error else "done"
+                if error:
+                    print(f"[{name}] ошибка: {error!r}")
+                else:
+                    print(f"[{name}] готово за {elapsed:.1f} с")
+
+    print(f"Пайплайн завершён за {time.perf_counter() - start:.1f} с: "
+          + ", ".join(f"{name}={status.get(name, 'pending')}" for name in _ordered(stages, selected)))
+    return status
+
+
+def _execute(stage, params, stamp, signature):
+    start = time.perf_counter()
+    try:
+        stage.run(params)
+    except Exception as e:
+        return time.perf_counter() - start, e
+    with open(stamp, "w", encoding="utf-8") as f:
+        json.dump({"signature": signature, "finished": time.strftime("%Y-%m-%d %H:%M:%S")}, f)
+    return time.perf_counter() - start, None
+
+
+def _up_to_date(stage, stamp, signature):
+    if not stamp.exists() or not all(Path(output).exists() for output in stage.outputs):
+        return False
+    with open(stamp, "r", encoding="utf-8") as f:
+        if json.load(f).get("signature") != signature:
+            return False
+    input_mtimes = [_newest_mtime(path) for path in stage.inputs]
+    if None in input_mtimes:
+        return False
+    # Штамп пишется после успешного выполнения, поэтому сравниваем с ним, а не с выходами:
+    # инкрементальные этапы могут не трогать выходы, если менять нечего
+    return stamp.stat().st_mtime >= max(input_mtimes, default=0)
+
+
+def _newest_mtime(path):
+    # Каталоги проверяются без рекурсии: новые или изменённые файлы меняют mtime самого каталога или файла в нём
+    matches = _expand(path)
+    if not matches:
+        return None
+    newest = 0
+    for match in matches:
+        newest = max(newest, match.stat().st_mtime)
+        if match.is_dir():
+            with os.scandir(match) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        newest = max(newest, entry.stat().st_mtime)
+    return newest
+
+
+def _expand(path):
+    path = Path(path)
+    if glob.has_magic(str(path)):
+        return [Path(p) for p in sorted(glob.glob(str(path)))]
+    return [path] if path.exists() else []
+
+
+def _select(stages, targets, enabled):
+    unknown = set(targets) - set(stages)
+    if unknown:
+        raise ValueError(f"Неизвестные этапы: {sorted(unknown)}, доступны {list(stages)}")
+    selected = set()
+    stack = list(targets)
+    while stack:
+        name = stack.pop()
+        if name in selected or name not in enabled:
+            continue
+        selected.add(name)
+        stack.extend(stages[name].after)
+    return selected
+
+
+def _ordered(stages, names):
+    return [name for name in stages if name in names]
+
+
+def _stage_paths(stage):
+    return [str(path) for path in stage.inputs + stage.outputs]
+
+
+def _run_extract(paths, params):
+    from utils.extract import extract_frames
+
+    extract_frames(paths["videos"], paths["frames"], **params)
+
+
+def _run_check(paths, params):
+    from utils.validate import exit_code, validate_annotations
+
+    strict = params.get("strict", False)
+    report = validate_annotations(paths["frames"], paths["annotations"], paths["annotation_report"],
+                                  **{k: v for k, v in params.items() if k != "strict"})
+    if exit_code(report, strict):
+        raise RuntimeError(f"Аннотации не прошли проверку, см. {paths['annotation_report']}")
+
+
+def _run_augment(paths, params):
+    from utils.annotate import augment_data
+    from utils.store import AnnotationStore
+
+    store = AnnotationStore.load(paths["annotation_store"]) if "annotation_store" in paths else None
+    augment_data(paths["frames"], paths["annotations"], paths["augmented_images"], paths["augmented_labels"],
+                 incremental=True, annotation_store=store, **params)
+
+
+def _run_dataset(paths, params):
+    from utils.dataset import create_dataset_structure
+
+    create_dataset_structure(paths["augmented_images"], paths["augmented_labels"], paths["dataset"],
+                             incremental=True, **params)
+
+
+def _run_train(paths, params):
+    from utils.baseline import train_yolo
+
+    params = dict(params)
+    experiment_name = params.pop("experiment_name", "baseline")
+    train_yolo(paths["dataset"] / "data.yaml", paths["experiments"] / experiment_name, **params)
+
+
+def _run_sweep(sweep_config):
+    from utils.sweep import run_sweep
+
+    run_sweep(sweep_config)
+
+
+def _run_plot(paths):
+    from utils.graph import generate_metrics_report, plot_yolo_metrics
+
+    metrics = plot_yolo_metrics(paths["experiments"], paths["plots"])
+    if not metrics:
+        raise RuntimeError(f"Нет результатов обучения в {paths['experiments']}")
+    generate_metrics_report(metrics, paths["plots"])
+
+
+def _run_inference(paths, params, base_dir):
+    from utils.video import create_inference_video
+
+    params = {k: base_dir / v if k.endswith("_path") else v for k, v in params.items()}
+    create_inference_video(paths["model"], paths["videos"], paths["inference_video"], **params)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Неинтерактивный запуск пайплайна по pipeline.yaml")
+    parser.add_argument("config", nargs="?", default="pipeline.yaml")
+    parser.add_argument("stages", nargs="*", help="целевые этапы (по умолчанию все включённые)")
+    parser.add_argument("--force", action="store_true", help="выполнить этапы без проверки актуальности")
+    parser.add_argument("--dry-run", action="store_true", help="только показать, что будет выполнено")
+    args = parser.parse_args()
+    result = run_pipeline(args.config, args.stages, args.force, args.dry_run)
+    sys.exit(1 if any(state in ("failed", "blocked") for state in result.values()) else 0)
@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import bisect
+import threading
+from pathlib import Path
+
+
+ENV_VAR = "PIPELINE_PROFILE"
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+MAX_EVENTS = 200_000
+
+_enabled = os.environ.get(ENV_VAR, "") not in ("", "0")
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_events = []
+_wall_offset = time.time() - time.perf_counter()
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = flag
+    # Через переменную окружения включение наследуют рабочие процессы ProcessPoolExecutor
+    os.environ[ENV_VAR] = "1" if flag else "0"
+
+
+def enabled():
+    return _enabled
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, (time.perf_counter() - self.start) * 1000, self.start)
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name):
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+
+def observe(name, duration_ms, start=None):
+    if not _enabled:
+        return
+    if start is None:
+        start = time.perf_counter() - duration_ms / 1000
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = {
+                "buckets": [0] * len(BUCKETS_MS), "sum": 0.0, "count": 0, "min": duration_ms, "max": duration_ms
+            }
+        histogram["buckets"][bisect.bisect_left(BUCKETS_MS, duration_ms)] += 1
+        histogram["sum"] += duration_ms
+        histogram["count"] += 1
+        histogram["min"] = min(histogram["min"], duration_ms)
+        histogram["max"] = max(histogram["max"], duration_ms)
+        if len(_events) < MAX_EVENTS:
+            _events.append({
+                "name": name, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+                "ts": (_wall_offset + start) * 1e6, "dur": duration_ms * 1000
+            })
+
+
+def count(name, value=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def snapshot(reset=False):
+    with _lock:
+        data = {
+            "histograms": {name: {**h, "buckets": list(h["buckets"])} for name, h in _histograms.items()},
+            "counters": dict(_counters),
+            "events": list(_events)
+        }
+        if reset:
+            _histograms.clear()
+            _counters.clear()
+            _events.clear()
+    return data
+
+
+def collect():
+    return snapshot(reset=True) if _enabled else None
+
+
+def merge(data):
+    if data is None:
+        return
+    with _lock:
+        for name, other in data["histograms"].items():
+            histogram = _histograms.get(name)
+            if histogram is None:
+                _histograms[name] = {**other, "buckets": list(other["buckets"])}
+                continue
+            histogram["buckets"] = [a + b for a, b in zip(histogram["buckets"], other["buckets"])]
+            histogram["sum"] += other["sum"]
+            histogram["count"] += other["count"]
+            histogram["min"] = min(histogram["min"], other["min"])
+            histogram["max"] = max(histogram["max"], other["max"])
+        for name, value in data["counters"].items():
+            _counters[name] = _counters.get(name, 0) + value
+        _events.extend(data["events"][:MAX_EVENTS - len(_events)])
+
+
+def reset():
+    snapshot(reset=True)
+
+
+def summary():
+    data = snapshot()
+    stages = {}
+    for name, h in sorted(data["histograms"].items()):
+        stages[name] = {
+            "count": h["count"],
+            "total_ms": h["sum"],
+            "mean_ms": h["sum"] / h["count"],
+            "p50_ms": _bucket_quantile(h, 0.5),
+            "p95_ms": _bucket_quantile(h, 0.95),
+            "max_ms": h["max"]
+        }
+    return {"stages": stages, "counters": data["counters"]}
+
+
+def export_json(path):
+    data = snapshot()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({**summary(), "traceEvents": data["events"], "displayTimeUnit": "ms"}, f)
+
+
+def export_prometheus(path, prefix="pipeline"):
+    data = snapshot()
+    lines = [f"# TYPE {prefix}_stage_seconds histogram"]
+    for name, h in sorted(data["histograms"].items()):
+        cumulative = 0
+        for bound, bucket in zip(BUCKETS_MS, h["buckets"]):
+            cumulative += bucket
+            le = "+Inf" if bound == float("inf") else f"{bound / 1000:g}"
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {h["sum"] / 1000:.6f}')
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {h["count"]}')
+    lines.append(f"# TYPE {prefix}_events_total counter")
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f'{prefix}_events_total{{name="{name}"}} {value}')
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def report(output_stem=None):
+    if not _enabled:
+        return None
+    result = summary()
+    total = sum(stage["total_ms"] for stage in result["stages"].values()) or 1.0
+    print(f"{'Этап':<16}{'вызовов':>10}{'всего, с':>12}{'доля':>8}{'p50, мс':>10}{'p95, мс':>10}")
+    for name, stage in sorted(result["stages"].items(), key=lambda item: -item[1]["total_ms"]):
+        print(f"{name:<16}{stage['count']:>10}{stage['total_ms'] / 1000:>12.2f}{stage['total_ms'] / total:>8.1%}"
+              f"{stage['p50_ms']:>10.2f}{stage['p95_ms']:>10.2f}")
+    for name, value in sorted(result["counters"].items()):
+        print(f"{name}: {value}")
+
+    if output_stem is not None:
+        output_stem = Path(output_stem)
+        output_stem.parent.mkdir(parents=True, exist_ok=True)
+        export_json(f"{output_stem}_trace.json")
+        export_prometheus(f"{output_stem}.prom")
+        print(f"Профиль сохранён в {output_stem}_trace.json и {output_stem}.prom")
+    return result
+
+
+def _bucket_quantile(histogram, q):
+    target = q * histogram["count"]
+    cumulative = 0
+    for bound, bucket in zip(BUCKETS_MS, histogram["buckets"]):
+        cumulative += bucket
+        if cumulative >= target:
+            return min(bound, histogram["max"])
+    return histogram["max"]
@@ -0,0 +1,125 @@
+import os
+import argparse
+import yaml
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from utils.store import AnnotationStore, read_yolo_file, write_yolo_file
+
+
+def propagate_labels(keyframes, annotation_dir, interval=3, mode="hold", iou_threshold=0.3,
+                     output_dir=None, annotation_store=None, store_path=None, workers=8):
+    if mode not in ("hold", "interpolate"):
+        raise ValueError(f"Неизвестный режим: {mode}, ожидается hold или interpolate")
+    output_dir = annotation_dir if output_dir is None else output_dir
+
+    records = {}
+    for video, spec in keyframes.items():
+        if not isinstance(spec, dict):
+            spec = {"keyframes": spec}
+        frames = sorted(spec["keyframes"])
+        labels = [_load_labels(video, frame, annotation_dir, annotation_store) for frame in frames]
+        if any(label is None for label in labels):
+            missing = [frame for frame, label in zip(frames, labels) if label is None]
+            print(f"Ошибка: Для {video} отсутствуют аннотации ключевых кадров {missing}")
+            continue
+
+        segments = list(zip(frames, frames[1:], labels, labels[1:]))
+        if spec.get("end") is not None and spec["end"] > frames[-1]:
+            segments.append((frames[-1], spec["end"] + 1, labels[-1], None))
+
+        for start, end, start_labels, end_labels in segments:
+            targets = _grid(start, end, interval)
+            if mode == "interpolate" and end_labels is not None:
+                filled = _interpolate(start_labels, end_labels, (targets - start) / (end - start), iou_threshold)
+            else:
+                filled = [start_labels] * len(targets)
+            records.update((f"{video}_frame_{frame:05d}", label) for frame, label in zip(targets, filled))
+
+    if store_path is not None:
+        # Новое хранилище начинается с разметки annotation_dir: иначе ключевые кадры в нём были бы фоном
+        base = annotation_store if annotation_store is not None else AnnotationStore.from_yolo_dir(annotation_dir, workers)
+        base.merge(records).save(store_path)
+        print(f"Размечено {len(records)} кадров, хранилище сохранено в {store_path}")
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(
+                lambda item: write_yolo_file(os.path.join(output_dir, f"{item[0]}.txt"), *item[1]),
+                records.items()
+            ))
+        print(f"Размечено {len(records)} кадров в {output_dir}")
+    return records
+
+
+def _load_labels(video, frame, annotation_dir, annotation_store):
+    name = f"{video}_frame_{frame:05d}"
+    if annotation_store is not None:
+        return annotation_store.labels(name) if name in annotation_store else None
+    path = os.path.join(annotation_dir, f"{name}.txt")
+    return read_yolo_file(path) if os.path.exists(path) else None
+
+
+def _grid(start, end, interval):
+    first = -(-(start + 1) // interval) * interval
+    return np.arange(first, end, interval)
+
+
+def _iou_matrix(a, b):
+    a_min, a_max = a[:, None, :2] - a[:, None, 2:] / 2, a[:, None, :2] + a[:, None, 2:] / 2
+    b_min, b_max = b[None, :, :2] - b[None, :, 2:] / 2, b[None, :, :2] + b[None, :, 2:] / 2
+    inter = np.clip(np.minimum(a_max, b_max) - np.maximum(a_min, b_min), 0, None).prod(axis=2)
+    union = a[:, None, 2:].prod(axis=2) + b[None, :, 2:].prod(axis=2) - inter
+    return inter / np.maximum(union, 1e-9)
+
+
+def _match(start_labels, end_labels, iou_threshold):
+    (start_classes, start_boxes), (end_classes, end_boxes) = start_labels, end_labels
+    iou = _iou_matrix(start_boxes, end_boxes)
+    iou[start_classes[:, None] != end_classes[None, :]] = 0
+    pairs = []
+    while iou.size and iou.max() >= iou_threshold:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        pairs.append((i, j))
+        iou[i, :] = 0
+        iou[:, j] = 0
+    return pairs
+
+
+def _interpolate(start_labels, end_labels, t, iou_threshold):
+    pairs = _match(start_labels, end_labels, iou_threshold)
+    start_idx = np.array([i for i, _ in pairs], dtype=np.int64)
+    end_idx = np.array([j for _, j in pairs], dtype=np.int64)
+    start_only = np.setdiff1d(np.arange(len(start_labels[0])), start_idx)
+    end_only = np.setdiff1d(np.arange(len(end_labels[0])), end_idx)
+
+    b0, b1 = start_labels[1][start_idx], end_labels[1][end_idx]
+    moving = b0[None] + t[:, None, None] * (b1 - b0)[None]
+    matched_classes = start_labels[0][start_idx]
+
+    filled = []
+    for k, tk in enumerate(t):
+        if tk < 0.5:
+            classes = np.concatenate([matched_classes, start_labels[0][start_only]])
+            boxes = np.concatenate([moving[k], start_labels[1][start_only]])
+        else:
+            classes = np.concatenate([matched_classes, end_labels[0][end_only]])
+            boxes = np.concatenate([moving[k], end_labels[1][end_only]])
+        filled.append((classes, boxes))
+    return filled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Распространение разметки ключевых кадров на промежуточные")
+    parser.add_argument("keyframes", help="YAML: {видео: {keyframes: [...], end: N}}")
+    parser.add_argument("annotation_dir")
+    parser.add_argument("--interval", type=int, default=3)
+    parser.add_argument("--mode", choices=("hold", "interpolate"), default="hold")
+    parser.add_argument("--iou", type=float, default=0.3)
+    parser.add_argument("--store", default=None, help="записать результат в хранилище аннотаций вместо .txt")
+    args = parser.parse_args()
+
+    with open(args.keyframes, "r", encoding="utf-8") as f:
+        keyframes = yaml.safe_load(f)
+    store = AnnotationStore.load(args.store, mmap=False) if args.store and os.path.isdir(args.store) else None
+    propagate_labels(keyframes, args.annotation_dir, args.interval, args.mode, args.iou,
+                     annotation_store=store, store_path=args.store)
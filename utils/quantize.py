@@ -0,0 +1,106 @@
+import os
+import json
+import random
+import argparse
+import cv2
+import numpy as np
+from pathlib import Path
+from utils.backends import OnnxBackend, export_model, letterbox
+from utils.dataset import dataset_images
+from utils.evaluate import evaluate_backend
+
+
+def quantize_model(model_path, data_yaml, calibration_images=200, max_map_drop=0.01, imgsz=640,
+                   seed=0, num_threads=None):
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    fp32_path = export_model(model_path, "onnx")
+    int8_path = fp32_path.with_name(f"{fp32_path.stem}_int8.onnx")
+    candidate_path = fp32_path.with_name(f"{fp32_path.stem}_int8.candidate.onnx")
+    report_path = fp32_path.with_name(f"{fp32_path.stem}_int8_report.json")
+
+    images = dataset_images(data_yaml, "train")
+    random.Random(seed).shuffle(images)
+    reader = _CalibrationReader(images[:calibration_images], imgsz)
+    print(f"Калибровка INT8 на {len(reader.images)} изображениях из train...")
+    quantize_static(
+        str(fp32_path),
+        str(candidate_path),
+        reader,
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        calibrate_method=CalibrationMethod.MinMax
+    )
+
+    fp32 = evaluate_backend(OnnxBackend(fp32_path, imgsz, conf=0.001, num_threads=num_threads), data_yaml, "test")
+    int8 = evaluate_backend(OnnxBackend(candidate_path, imgsz, conf=0.001, num_threads=num_threads), data_yaml, "test")
+    report = {
+        "fp32": fp32,
+        "int8": int8,
+        "map50_drop": fp32["map50"] - int8["map50"],
+        "map50_95_drop": fp32["map50_95"] - int8["map50_95"],
+        "speedup": fp32["ms_per_image"] / max(int8["ms_per_image"], 1e-9),
+        "max_map_drop": max_map_drop
+    }
+    # Без разметки обе модели дают mAP 0 и нулевое падение - такое сравнение ничего не проверяет
+    report["labels_ok"] = fp32["gt_boxes"] > 0 and fp32["missing_labels"] == 0
+    report["published"] = (report["labels_ok"] and report["map50_drop"] <= max_map_drop
+                           and report["map50_95_drop"] <= max_map_drop)
+
+    print(f"FP32: mAP50 {fp32['map50']:.4f}, mAP50-95 {fp32['map50_95']:.4f}, {fp32['ms_per_image']:.1f} мс/кадр")
+    print(f"INT8: mAP50 {int8['map50']:.4f}, mAP50-95 {int8['map50_95']:.4f}, {int8['ms_per_image']:.1f} мс/кадр")
+    print(f"Ускорение x{report['speedup']:.2f}, падение mAP50 {report['map50_drop']:.4f}, "
+          f"mAP50-95 {report['map50_95_drop']:.4f} (порог {max_map_drop})")
+
+    if report["published"]:
+        os.replace(candidate_path, int8_path)
+        report["model"] = str(int8_path)
+        print(f"INT8 модель опубликована: {int8_path}")
+    elif not report["labels_ok"]:
+        os.remove(candidate_path)
+        print(f"INT8 модель не опубликована: в test нет разметки для проверки "
+              f"(боксов: {fp32['gt_boxes']}, изображений без файла разметки: {fp32['missing_labels']})")
+    else:
+        os.remove(candidate_path)
+        print("INT8 модель не опубликована: падение точности превышает порог")
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+class _CalibrationReader:
+    def __init__(self, images, imgsz):
+        self.images = images
+        self.imgsz = imgsz
+        self._iterator = None
+
+    def get_next(self):
+        if self._iterator is None:
+            self._iterator = iter(self.images)
+        for path in self._iterator:
+            image = cv2.imread(path)
+            if image is None:
+                continue
+            image, _ = letterbox(image, self.imgsz)
+            blob = np.ascontiguousarray(image[..., ::-1].transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+            return {"images": blob}
+        return None
+
+    def rewind(self):
+        self._iterator = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="INT8 квантизация модели с проверкой точности на test")
+    parser.add_argument("model", help="путь к best.pt")
+    parser.add_argument("data", help="путь к data.yaml")
+    parser.add_argument("--calibration-images", type=int, default=200)
+    parser.add_argument("--max-map-drop", type=float, default=0.01)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+    report = quantize_model(Path(args.model), args.data, args.calibration_images, args.max_map_drop,
+                            num_threads=args.threads)
+    raise SystemExit(0 if report["published"] else 1)
@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+
+
+# Палитра ultralytics в BGR: цвета классов совпадают с прежними роликами на results.plot()
+PALETTE = tuple(
+    (int(h[4:6], 16), int(h[2:4], 16), int(h[0:2], 16)) for h in (
+        "FF3838", "FF9D97", "FF701F", "FFB21D", "CFD231", "48F90A", "92CC17", "3DDB86", "1A9334", "00D4BB",
+        "2C99A8", "00C2FF", "344593", "6473FF", "0018EC", "8438FF", "520085", "CB38FF", "FF95C8", "FF37C7"
+    )
+)
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+class OverlayRenderer:
+    def __init__(self, names, line_width=2, font_scale=0.6, max_glyphs=4096):
+        self.names = names
+        self.line_width = line_width
+        self.font_scale = font_scale
+        self.thickness = max(line_width - 1, 1)
+        self.max_glyphs = max_glyphs
+        self._glyphs = {}
+
+    def draw(self, frame, boxes):
+        if not len(boxes):
+            return frame
+        height, width = frame.shape[:2]
+        xyxy = boxes[:, :4].round().astype(np.int32)
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, width - 1)
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, height - 1)
+        classes = boxes[:, -1].astype(np.int32)
+        scores = boxes[:, -2]
+        track_ids = boxes[:, 4].astype(np.int32) if boxes.shape[1] == 7 else [None] * len(boxes)
+
+        for (x1, y1, x2, y2), cls, score, track_id in zip(xyxy.tolist(), classes.tolist(), scores.tolist(), track_ids):
+            color = PALETTE[cls % len(PALETTE)]
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, self.line_width, cv2.LINE_AA)
+            glyph = self._glyph(cls, round(score, 2), None if track_id is None else int(track_id))
+            glyph_h, glyph_w = glyph.shape[:2]
+            top = y1 - glyph_h if y1 >= glyph_h else y1
+            visible_h, visible_w = min(glyph_h, height - top), min(glyph_w, width - x1)
+            frame[top:top + visible_h, x1:x1 + visible_w] = glyph[:visible_h, :visible_w]
+        return frame
+
+    def _glyph(self, cls, score, track_id):
+        key = (cls, score, track_id)
+        glyph = self._glyphs.get(key)
+        if glyph is not None:
+            return glyph
+        if len(self._glyphs) >= self.max_glyphs:
+            self._glyphs.clear()
+
+        text = f"{self.names.get(cls, cls)} {score:.2f}"
+        if track_id is not None:
+            text = f"id:{track_id} {text}"
+        (text_w, text_h), baseline = cv2.getTextSize(text, FONT, self.font_scale, self.thickness)
+        color = PALETTE[cls % len(PALETTE)]
+        glyph = np.empty((text_h + baseline + 4, text_w + 4, 3), dtype=np.uint8)
+        glyph[:] = color
+        text_color = (0, 0, 0) if 0.114 * color[0] + 0.587 * color[1] + 0.299 * color[2] > 150 else (255, 255, 255)
+        cv2.putText(glyph, text, (2, text_h + 2), FONT, self.font_scale, text_color, self.thickness, cv2.LINE_AA)
+        self._glyphs[key] = glyph
+        return glyph
@@ -0,0 +1,218 @@
+import os
+import csv
+import json
+import yaml
+from pathlib import Path
+from utils.manifest import config_hash, file_hash, fingerprint_files
+from utils.dataset import dataset_images, label_path
+
+
+FINGERPRINT_FILE = "run_fingerprint.json"
+IGNORED_ARGS = {"data", "model", "name", "project", "exist_ok", "save_dir", "verbose", "plots", "workers", "resume", "device"}
+
+
+def cached_train(weights, **train_args):
+    from ultralytics import YOLO
+
+    weights = _resolve_weights(str(weights))
+    fingerprint = run_fingerprint(train_args["data"], weights, train_args)
+    search_dir = _search_dir(train_args)
+    run_dir, record = find_run(search_dir, fingerprint)
+
+    if record is not None and record["status"] == "completed":
+        print(f"Найден завершённый запуск с тем же датасетом и параметрами: {run_dir}, обучение пропущено")
+        return load_run_result(run_dir)
+
+    if record is not None:
+        print(f"Продолжение прерванного запуска {run_dir}")
+        model = YOLO(run_dir / "weights/last.pt")
+        _add_fingerprint_callbacks(model, fingerprint, weights, train_args)
+        model.train(resume=True)
+        return {**load_run_result(model.trainer.save_dir), "cached": False}
+
+    model = YOLO(weights)
+    _add_fingerprint_callbacks(model, fingerprint, weights, train_args)
+    model.train(**train_args)
+    # Тот же формат, что и при попадании в кэш: пути к весам и метрики последней эпохи из results.csv
+    return {**load_run_result(model.trainer.save_dir), "cached": False}
+
+
+def run_fingerprint(data_yaml, weights, train_args):
+    return config_hash({
+        "dataset": dataset_fingerprint(data_yaml),
+        # Отсутствующие веса (например, ещё не скачанные yolo11s.pt) различаются по имени
+        "weights": file_hash(weights) if Path(weights).exists() else Path(weights).name,
+        "args": normalize_args(train_args)
+    })
+
+
+def normalize_args(train_args):
+    from ultralytics.cfg import get_cfg
+
+    # args.yaml старых запусков содержит save_dir и другие служебные ключи, которые get_cfg не принимает
+    cfg = vars(get_cfg(overrides={k: v for k, v in train_args.items() if k not in IGNORED_ARGS}))
+    return {k: v for k, v in sorted(cfg.items()) if k not in IGNORED_ARGS}
+
+
+def dataset_fingerprint(data_yaml):
+    data_yaml = Path(data_yaml)
+    with open(data_yaml, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+
+    files = {}
+    for split in ("train", "val", "test"):
+        for image in dataset_images(data_yaml, split):
+            files[f"{split}:{Path(image).name}:image"] = image
+            files[f"{split}:{Path(image).name}:label"] = label_path(image)
+
+    cache_path = data_yaml.parent / ".dataset_fingerprints.json"
+    previous = {}
+    if cache_path.exists():
+        with open(cache_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+    fingerprints = fingerprint_files(files, previous)
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(fingerprints, f)
+
+    return config_hash({
+        "names": data.get("names"),
+        "files": {key: fp["hash"] if fp else None for key, fp in sorted(fingerprints.items())}
+    })
+
+
+def find_run(search_dir, fingerprint):
+    search_dir = Path(search_dir)
+    if not search_dir.is_dir():
+        return None, None
+    resumable = None, None
+    for fingerprint_path in sorted(search_dir.glob(f"*/{FINGERPRINT_FILE}")):
+        with open(fingerprint_path, "r", encoding="utf-8") as f:
+            record = json.load(f)
+        if record.get("fingerprint") != fingerprint:
+            continue
+        run_dir = fingerprint_path.parent
+        # Завершённый запуск важнее прерванного: иначе оборванный запуск перекрывает готовый и обучение повторяется
+        if record["status"] == "completed" and (run_dir / "weights/best.pt").exists():
+            return run_dir, record
+        # Запуск без last.pt продолжить нельзя - такую запись пропускаем
+        if record["status"] == "running" and (run_dir / "weights/last.pt").exists() and resumable[0] is None:
+            resumable = run_dir, record
+
+    # Запуски, завершённые до появления run_fingerprint.json, сопоставляются по их args.yaml
+    for args_path in sorted(search_dir.glob("*/args.yaml")):
+        run_dir = args_path.parent
+        if (run_dir / FINGERPRINT_FILE).exists():
+            continue
+        legacy = _legacy_record(run_dir)
+        if legacy is not None and legacy["fingerprint"] == fingerprint:
+            _write_record(run_dir, fingerprint, legacy["weights"], legacy["args"], "completed")
+            print(f"Запуск {run_dir} без отпечатка сопоставлен по args.yaml")
+            return run_dir, {**legacy, "status": "completed"}
+    return resumable
+
+
+def _legacy_record(run_dir):
+    results_csv = run_dir / "results.csv"
+    if not (run_dir / "weights/best.pt").exists() or not results_csv.exists():
+        return None
+    args_path = run_dir / "args.yaml"
+    with open(args_path, "r", encoding="utf-8") as f:
+        args = yaml.safe_load(f) or {}
+    data_yaml, weights = args.get("data"), args.get("model")
+    if not data_yaml or not weights or not Path(data_yaml).exists():
+        return None
+    # results.png рисуется в конце обучения; без графиков завершённость видна по числу эпох
+    with open(results_csv, "r", newline="") as f:
+        epochs_done = max(sum(1 for _ in f) - 1, 0)
+    if not (run_dir / "results.png").exists() and epochs_done < args.get("epochs", 0):
+        return None
+    # Датасет, изменённый после старта запуска, этот запуск не видел
+    if _newest_dataset_mtime(data_yaml) > args_path.stat().st_mtime:
+        return None
+    train_args = {k: v for k, v in args.items() if k not in IGNORED_ARGS or k == "data"}
+    try:
+        fingerprint = run_fingerprint(data_yaml, str(weights), train_args)
+    except Exception as e:
+        print(f"Предупреждение: не удалось сопоставить {run_dir} по args.yaml: {e}")
+        return None
+    return {"fingerprint": fingerprint, "weights": str(weights), "args": train_args}
+
+
+def _newest_dataset_mtime(data_yaml):
+    newest = 0
+    for split in ("train", "val", "test"):
+        for image in dataset_images(data_yaml, split):
+            for path in (image, label_path(image)):
+                try:
+                    newest = max(newest, os.stat(path).st_mtime)
+                except FileNotFoundError:
+                    pass
+    return newest
+
+
+def register_run(run_dir, data_yaml, weights, train_args, status="completed"):
+    fingerprint = run_fingerprint(data_yaml, str(weights), {**train_args, "data": data_yaml})
+    _write_record(Path(run_dir), fingerprint, str(weights), train_args, status)
+    return fingerprint
+
+
+def load_run_result(run_dir):
+    run_dir = Path(run_dir)
+    metrics = {}
+    results_csv = run_dir / "results.csv"
+    if results_csv.exists():
+        with open(results_csv, "r", newline="") as f:
+            rows = [{k.strip(): v for k, v in row.items()} for row in csv.DictReader(f)]
+        if rows:
+            metrics = {k: float(v) for k, v in rows[-1].items() if v.strip()}
+    return {
+        "save_dir": str(run_dir),
+        "weights": str(run_dir / "weights/best.pt"),
+        "metrics": metrics,
+        "cached": True
+    }
+
+
+def _add_fingerprint_callbacks(model, fingerprint, weights, train_args):
+    def on_train_start(trainer):
+        _write_record(Path(trainer.save_dir), fingerprint, weights, train_args, "running")
+
+    def on_train_end(trainer):
+        _write_record(Path(trainer.save_dir), fingerprint, weights, train_args, "completed")
+
+    model.add_callback("on_train_start", on_train_start)
+    model.add_callback("on_train_end", on_train_end)
+
+
+def _write_record(run_dir, fingerprint, weights, train_args, status):
+    run_dir.mkdir(parents=True, exist_ok=True)
+    record = {
+        "fingerprint": fingerprint,
+        "status": status,
+        "weights": weights,
+        "args": {k: str(v) if isinstance(v, Path) else v for k, v in train_args.items()}
+    }
+    with open(run_dir / FINGERPRINT_FILE, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False, indent=2)
+
+
+def _resolve_weights(weights):
+    if Path(weights).exists():
+        return weights
+    from ultralytics.utils.downloads import attempt_download_asset
+
+    # Как и YOLO("yolo11s.pt"), скачиваем официальные веса, если их нет на диске
+    try:
+        return str(attempt_download_asset(weights))
+    except Exception as e:
+        print(f"Предупреждение: не удалось получить веса {weights}: {e}")
+        return weights
+
+
+def _search_dir(train_args):
+    if train_args.get("project"):
+        return Path(train_args["project"])
+    name = Path(train_args.get("name", "train"))
+    if name.is_absolute():
+        return name.parent
+    return Path("runs/detect")
@@ -0,0 +1,202 @@
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import cv2
+import yaml
+import numpy as np
+from aiohttp import web, WSMsgType
+from utils.backends import BACKENDS, load_backend
+from utils.detections import format_detections
+
+
+class DynamicBatcher:
+    def __init__(self, models, max_batch=8, max_wait=0.01, queue_size=256):
+        self.models = models
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.stats = {"frames": 0, "batches": 0, "rejected": 0, "inference_s": 0.0}
+        self._tasks = []
+
+    async def start(self):
+        # На каждую копию модели - свой поток: модели не делят состояние и не блокируют цикл событий
+        for model in self.models:
+            executor = ThreadPoolExecutor(max_workers=1)
+            self._tasks.append((asyncio.create_task(self._worker(model, executor)), executor))
+
+    async def stop(self):
+        for task, executor in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            executor.shutdown(wait=False)
+        self._tasks = []
+
+    async def detect(self, frame):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((frame, future))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _worker(self, model, executor):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            batch = [(frame, future) for frame, future in batch if not future.cancelled()]
+            if not batch:
+                continue
+            start = time.perf_counter()
+            try:
+                detections = await loop.run_in_executor(executor, model.predict, [frame for frame, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.stats["inference_s"] += time.perf_counter() - start
+            self.stats["frames"] += len(batch)
+            self.stats["batches"] += 1
+            for (_, future), boxes in zip(batch, detections):
+                if not future.done():
+                    future.set_result(boxes)
+
+
+def load_class_names(data_yaml):
+    with open(data_yaml, "r", encoding="utf-8") as f:
+        names = yaml.safe_load(f)["names"]
+    return dict(enumerate(names)) if isinstance(names, list) else {int(k): v for k, v in names.items()}
+
+
+def create_app(model_path, data_yaml=None, backend="torch", max_batch=8, max_wait=0.01, workers=1,
+               num_threads=None, imgsz=640, conf=0.5, queue_size=256):
+    models = [load_backend(model_path, backend, imgsz=imgsz, conf=conf, num_threads=num_threads)
+              for _ in range(workers)]
+    names = load_class_names(data_yaml) if data_yaml is not None else models[0].names
+    batcher = DynamicBatcher(models, max_batch, max_wait, queue_size)
+
+    app = web.Application(client_max_size=16 * 2**20)
+    app["batcher"] = batcher
+    app["names"] = names
+    app.router.add_post("/detect", _handle_detect)
+    app.router.add_get("/ws", _handle_websocket)
+    app.router.add_get("/health", _handle_health)
+
+    async def on_startup(app):
+        await batcher.start()
+
+    async def on_cleanup(app):
+        await batcher.stop()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    print(f"Модель {model_path} загружена ({backend}, копий: {workers}), "
+          f"max_batch={max_batch}, max_wait={max_wait * 1000:.0f} мс")
+    return app
+
+
+async def _decode(data):
+    if not data:
+        raise ValueError("Пустое тело запроса, ожидается JPEG")
+    try:
+        frame = await asyncio.get_running_loop().run_in_executor(
+            None, cv2.imdecode, np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR
+        )
+    except cv2.error:
+        frame = None
+    if frame is None:
+        raise ValueError("Не удалось декодировать JPEG")
+    return frame
+
+
+async def _process(app, data):
+    start = time.perf_counter()
+    frame = await _decode(data)
+    boxes = await app["batcher"].detect(frame)
+    return {
+        "width": frame.shape[1],
+        "height": frame.shape[0],
+        "detections": format_detections(boxes, app["names"]),
+        "latency_ms": (time.perf_counter() - start) * 1000
+    }
+
+
+async def _handle_detect(request):
+    data = await request.read()
+    try:
+        result = await _process(request.app, data)
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=str(e))
+    except asyncio.QueueFull:
+        raise web.HTTPServiceUnavailable(text="Очередь инференса переполнена")
+    return web.json_response(result)
+
+
+async def _handle_websocket(request):
+    ws = web.WebSocketResponse(max_msg_size=16 * 2**20)
+    await ws.prepare(request)
+    stream = request.query.get("stream")
+    frame_idx = 0
+    async for message in ws:
+        if message.type == WSMsgType.BINARY:
+            try:
+                result = await _process(request.app, message.data)
+            except ValueError as e:
+                result = {"error": str(e)}
+            except asyncio.QueueFull:
+                result = {"error": "Очередь инференса переполнена"}
+            await ws.send_json({"stream": stream, "frame": frame_idx, **result})
+            frame_idx += 1
+        elif message.type == WSMsgType.ERROR:
+            print(f"Ошибка WebSocket ({stream}): {ws.exception()}")
+    return ws
+
+
+async def _handle_health(request):
+    batcher = request.app["batcher"]
+    stats = batcher.stats
+    return web.json_response({
+        **stats,
+        "queue": batcher.queue.qsize(),
+        "mean_batch": stats["frames"] / stats["batches"] if stats["batches"] else 0.0
+    })
+
+
+if __name__ == "__main__":
+    base_dir = Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(description="HTTP/WebSocket сервис детекции с динамическим батчингом")
+    parser.add_argument("--model", default=str(base_dir / "annotations/experiments/baseline9/weights/best.pt"))
+    parser.add_argument("--data", default=str(base_dir / "annotations/dataset/data.yaml"))
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=1, help="число копий модели")
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    app = create_app(
+        args.model, args.data if Path(args.data).exists() else None, args.backend, args.max_batch,
+        args.max_wait_ms / 1000, args.workers, args.threads
+    )
+    web.run_app(app, host=args.host, port=args.port)
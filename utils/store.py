@@ -0,0 +1,191 @@
+import os
+import re
+import argparse
+import hashlib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+
+_FRAME_PATTERN = re.compile(r"^(.*)_frame_(\d+)$")
+_ARRAYS = ("names", "offsets", "classes", "boxes", "videos", "image_video", "image_frame")
+
+
+class AnnotationStore:
+    def __init__(self, names, offsets, classes, boxes, videos=None, image_video=None, image_frame=None):
+        self.names = np.asarray(names)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.classes = np.asarray(classes, dtype=np.int16)
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        if videos is None:
+            videos, image_video, image_frame = _parse_frames(self.names)
+        self.videos = np.asarray(videos)
+        self.image_video = np.asarray(image_video, dtype=np.int32)
+        self.image_frame = np.asarray(image_frame, dtype=np.int32)
+        self._index = None
+
+    @classmethod
+    def from_records(cls, records):
+        names = sorted(records)
+        counts = np.array([len(records[name][0]) for name in names], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        classes = np.concatenate([np.asarray(records[name][0], dtype=np.int16) for name in names] or [np.empty(0, np.int16)])
+        boxes = np.concatenate([np.asarray(records[name][1], dtype=np.float32).reshape(-1, 4) for name in names]
+                               or [np.empty((0, 4), np.float32)])
+        return cls(np.array(names, dtype=str), offsets, classes, boxes)
+
+    @classmethod
+    def from_yolo_dir(cls, annotation_dir, workers=8):
+        files = sorted(f for f in os.listdir(annotation_dir) if f.endswith(".txt") and f != "classes.txt")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            parsed = executor.map(lambda f: read_yolo_file(os.path.join(annotation_dir, f)), files)
+            records = {f[:-4]: labels for f, labels in zip(files, parsed)}
+        return cls.from_records(records)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in _ARRAYS}
+        return cls(**arrays)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = {str(name): i for i, name in enumerate(self.names)}
+        return self._index
+
+    def labels(self, name):
+        i = self.index[name]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.classes[start:end], self.boxes[start:end]
+
+    def label_hash(self, name):
+        classes, boxes = self.labels(name)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(np.ascontiguousarray(classes).tobytes())
+        h.update(np.ascontiguousarray(boxes).tobytes())
+        return h.hexdigest()
+
+    def boxes_per_image(self):
+        return np.diff(self.offsets)
+
+    def class_counts(self, minlength=11):
+        return np.bincount(self.classes, minlength=minlength)
+
+    def box_image_index(self):
+        return np.repeat(np.arange(len(self.names)), self.boxes_per_image())
+
+    def frame_range(self, video, start, end):
+        video_ids = np.flatnonzero(self.videos == video)
+        if len(video_ids) == 0:
+            return np.empty(0, dtype=np.int64)
+        mask = (self.image_video == video_ids[0]) & (self.image_frame >= start) & (self.image_frame <= end)
+        return np.flatnonzero(mask)
+
+    def select(self, indices):
+        indices = np.asarray(indices, dtype=np.int64)
+        counts = self.boxes_per_image()[indices]
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        box_idx = np.repeat(self.offsets[indices] - offsets[:-1], counts) + np.arange(offsets[-1])
+        return AnnotationStore(self.names[indices], offsets, self.classes[box_idx], self.boxes[box_idx])
+
+    def records(self):
+        return {str(name): self.labels(str(name)) for name in self.names}
+
+    def merge(self, records):
+        merged = self.records()
+        merged.update(records)
+        return AnnotationStore.from_records(merged)
+
+    def write_yolo(self, name, path):
+        classes, boxes = self.labels(name)
+        write_yolo_file(path, classes, boxes)
+
+    def to_yolo_dir(self, output_dir, names=None):
+        os.makedirs(output_dir, exist_ok=True)
+        names = self.names if names is None else names
+        for name in names:
+            self.write_yolo(str(name), os.path.join(output_dir, f"{name}.txt"))
+
+
+def store_fingerprint(store, name):
+    if name not in store:
+        return None
+    return {"hash": store.label_hash(name)}
+
+
+def read_yolo_file(path):
+    with open(path, "r") as f:
+        content = f.read()
+    lines = [line for line in content.splitlines() if line.strip()]
+    bad_lines = 0
+    try:
+        # Разбиение по строкам: строки с 4 и 6 полями не должны склеиться в два «правильных» бокса
+        values = np.array([line.split() for line in lines], dtype=np.float32).reshape(len(lines), 5)
+    except ValueError:
+        rows = []
+        for line in lines:
+            try:
+                row = [float(v) for v in line.split()]
+            except ValueError:
+                row = []
+            if len(row) == 5:
+                rows.append(row)
+            else:
+                bad_lines += 1
+        values = np.array(rows, dtype=np.float32).reshape(-1, 5)
+    # Дробный или отрицательный класс (как bad_class в validate) не округляем молча, а отбрасываем строку
+    valid_class = (values[:, 0] == np.round(values[:, 0])) & (values[:, 0] >= 0)
+    if not valid_class.all():
+        bad_lines += int(np.count_nonzero(~valid_class))
+        values = values[valid_class]
+    if bad_lines:
+        print(f"Ошибка в аннотации: {path} (некорректных строк: {bad_lines})")
+    return values[:, 0].astype(np.int16), values[:, 1:]
+
+
+def write_yolo_file(path, classes, boxes):
+    with open(path, "w") as f:
+        f.writelines(
+            f"{int(c)} {x:.6f} {y:.6f} {w:.6f} {h:.6f}\n"
+            for c, (x, y, w, h) in zip(classes, boxes)
+        )
+
+
+def _parse_frames(names):
+    video_names = []
+    video_ids = {}
+    image_video = np.full(len(names), -1, dtype=np.int32)
+    image_frame = np.full(len(names), -1, dtype=np.int32)
+    for i, name in enumerate(names):
+        match = _FRAME_PATTERN.match(str(name))
+        if match is None:
+            continue
+        video = match.group(1)
+        if video not in video_ids:
+            video_ids[video] = len(video_names)
+            video_names.append(video)
+        image_video[i] = video_ids[video]
+        image_frame[i] = int(match.group(2))
+    return np.array(video_names, dtype=str), image_video, image_frame
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Импорт YOLO-разметки (.txt) в хранилище аннотаций")
+    parser.add_argument("annotation_dir", help="каталог с .txt аннотациями")
+    parser.add_argument("store_path", help="каталог хранилища (создаётся или перезаписывается)")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    store = AnnotationStore.from_yolo_dir(args.annotation_dir, args.workers)
+    store.save(args.store_path)
+    print(f"Импортировано {len(store)} файлов разметки ({len(store.classes)} боксов) в {args.store_path}")
@@ -0,0 +1,199 @@
+import os
+import csv
+import json
+import math
+import time
+import random
+import argparse
+import itertools
+import multiprocessing as mp
+import yaml
+from pathlib import Path
+
+
+MAP_COLUMN = "metrics/mAP50-95(B)"
+
+
+def load_sweep_config(config_path):
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    config.setdefault("model", "../yolo11s.pt")
+    config.setdefault("name", "sweep")
+    config.setdefault("epochs", 100)
+    config.setdefault("max_parallel", 2)
+    config.setdefault("cpu_budget", os.cpu_count() or 1)
+    config.setdefault("poll_interval", 30)
+    config.setdefault("seed", 0)
+    config.setdefault("base", {})
+    config.setdefault("search", {})
+    config.setdefault("asha", {})
+    config["asha"].setdefault("min_epochs", 10)
+    config["asha"].setdefault("reduction_factor", 3)
+    return config
+
+
+def sample_trials(search, trials=None, seed=0):
+    if trials is None:
+        for name, spec in search.items():
+            if isinstance(spec, dict):
+                raise ValueError(f"Параметр {name} задан диапазоном, для него нужно указать trials")
+        keys = list(search)
+        return [dict(zip(keys, values)) for values in itertools.product(*(search[k] for k in keys))]
+
+    rng = random.Random(seed)
+    sampled = []
+    for _ in range(trials):
+        params = {}
+        for name, spec in search.items():
+            if not isinstance(spec, dict):
+                params[name] = rng.choice(spec)
+            elif spec.get("log"):
+                params[name] = math.exp(rng.uniform(math.log(spec["low"]), math.log(spec["high"])))
+            else:
+                params[name] = rng.uniform(spec["low"], spec["high"])
+            if isinstance(spec, dict) and spec.get("int"):
+                params[name] = int(round(params[name]))
+        sampled.append(params)
+    return sampled
+
+
+def rung_epochs(min_epochs, reduction_factor, max_epochs):
+    rungs = []
+    epoch = min_epochs
+    while epoch < max_epochs:
+        rungs.append(epoch)
+        epoch *= reduction_factor
+    return rungs
+
+
+def read_map_history(results_csv):
+    if not os.path.exists(results_csv):
+        return []
+    with open(results_csv, "r", newline="") as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        return []
+    header = [column.strip() for column in rows[0]]
+    if MAP_COLUMN not in header:
+        return []
+    column = header.index(MAP_COLUMN)
+    return [float(row[column]) for row in rows[1:] if len(row) > column and row[column].strip()]
+
+
+def run_sweep(config_path):
+    config = load_sweep_config(config_path)
+    project = Path(config["project"]).resolve()
+    trials = sample_trials(config["search"], config.get("trials"), config["seed"])
+    asha = config["asha"]
+    rungs = rung_epochs(asha["min_epochs"], asha["reduction_factor"], config["epochs"])
+    threads_per_trial = max(1, config["cpu_budget"] // config["max_parallel"])
+    # У каждого запуска перебора свои каталоги: ultralytics дописывает results.csv в существующий,
+    # а удалять их нельзя - там веса и результаты прошлых переборов
+    sweep_name = _unique_sweep_name(project, config["name"])
+
+    pending = list(enumerate(trials))
+    running = {}
+    rung_scores = {rung: [] for rung in rungs}
+    results = []
+    print(f"Запуск перебора {sweep_name}: {len(trials)} конфигураций, параллельно {config['max_parallel']}, ступени ASHA {rungs}")
+
+    while pending or running:
+        while pending and len(running) < config["max_parallel"]:
+            trial_id, params = pending.pop(0)
+            name = f"{sweep_name}_t{trial_id:03d}"
+            # val обязателен: ASHA читает mAP каждой эпохи из results.csv
+            train_args = {**config["base"], **params, "epochs": config["epochs"], "val": True}
+            process = mp.Process(
+                target=_train_trial,
+                args=(config["model"], config["data"], str(project), name, train_args, threads_per_trial)
+            )
+            process.start()
+            running[trial_id] = {"name": name, "params": params, "process": process, "rung": 0, "pruned": False}
+            print(f"Запущен {name}: {params}")
+
+        time.sleep(config["poll_interval"])
+
+        for trial_id, trial in list(running.items()):
+            history = read_map_history(project / trial["name"] / "results.csv")
+            while trial["rung"] < len(rungs) and len(history) >= rungs[trial["rung"]]:
+                rung = rungs[trial["rung"]]
+                score = max(history[:rung])
+                rung_scores[rung].append(score)
+                trial["rung"] += 1
+                if _should_prune(score, rung_scores[rung], asha["reduction_factor"]):
+                    trial["process"].terminate()
+                    trial["pruned"] = True
+                    print(f"Остановлен {trial['name']} на эпохе {rung}: mAP50-95 {score:.4f}")
+                    break
+
+            if trial["pruned"] or not trial["process"].is_alive():
+                trial["process"].join()
+                status = "pruned" if trial["pruned"] else ("completed" if trial["process"].exitcode == 0 else "failed")
+                results.append({
+                    "trial": trial["name"],
+                    "status": status,
+                    "epochs": len(history),
+                    "best_map50_95": max(history) if history else None,
+                    "params": trial["params"]
+                })
+                del running[trial_id]
+                if status != "pruned":
+                    print(f"Завершён {trial['name']}: {status}")
+
+    leaderboard = write_leaderboard(results, project / f"{sweep_name}_leaderboard")
+    return leaderboard
+
+
+def _unique_sweep_name(project, name):
+    base = f"{name}_{time.strftime('%Y%m%d_%H%M%S')}"
+    sweep_name, suffix = base, 1
+    while any(project.glob(f"{sweep_name}_*")):
+        suffix += 1
+        sweep_name = f"{base}_{suffix}"
+    return sweep_name
+
+
+def write_leaderboard(results, output_stem):
+    leaderboard = sorted(results, key=lambda r: -1 if r["best_map50_95"] is None else r["best_map50_95"], reverse=True)
+    for rank, row in enumerate(leaderboard, start=1):
+        row["rank"] = rank
+
+    with open(f"{output_stem}.json", "w", encoding="utf-8") as f:
+        json.dump(leaderboard, f, ensure_ascii=False, indent=2)
+
+    param_names = sorted({name for row in leaderboard for name in row["params"]})
+    with open(f"{output_stem}.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["rank", "trial", "status", "epochs", "best_map50_95"] + param_names)
+        for row in leaderboard:
+            writer.writerow([row["rank"], row["trial"], row["status"], row["epochs"], row["best_map50_95"]]
+                            + [row["params"].get(name) for name in param_names])
+
+    print(f"Таблица результатов сохранена в {output_stem}.csv")
+    for row in leaderboard[:5]:
+        print(f"  {row['rank']}. {row['trial']} ({row['status']}): mAP50-95 {row['best_map50_95']}")
+    return leaderboard
+
+
+def _should_prune(score, scores, reduction_factor):
+    if len(scores) < reduction_factor:
+        return False
+    keep = max(1, len(scores) // reduction_factor)
+    cutoff = sorted(scores, reverse=True)[keep - 1]
+    return score < cutoff
+
+
+def _train_trial(model_path, data, project, name, train_args, num_threads):
+    import torch
+    from ultralytics import YOLO
+
+    torch.set_num_threads(num_threads)
+    model = YOLO(model_path)
+    model.train(data=data, project=project, name=name, exist_ok=True, **train_args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Перебор гиперпараметров с ранней остановкой (ASHA)")
+    parser.add_argument("config", help="YAML с пространством поиска")
+    args = parser.parse_args()
+    run_sweep(args.config)
@@ -0,0 +1,139 @@
+import json
+import numpy as np
+from utils.evaluate import box_iou
+
+
+class Track:
+    __slots__ = ("track_id", "box", "velocity", "score", "cls", "pending_cls", "pending_hits", "last_frame")
+
+    def __init__(self, track_id, box, score, cls, frame_idx):
+        self.track_id = track_id
+        self.box = box
+        self.velocity = np.zeros(4, dtype=np.float32)
+        self.score = score
+        self.cls = cls
+        self.pending_cls = None
+        self.pending_hits = 0
+        self.last_frame = frame_idx
+
+    def predict(self, frame_idx):
+        return self.box + self.velocity * (frame_idx - self.last_frame)
+
+
+class IoUTracker:
+    def __init__(self, iou_threshold=0.3, max_age=30, confirm_hits=2, alpha=0.6, beta=0.3):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.confirm_hits = confirm_hits
+        self.alpha = alpha
+        self.beta = beta
+        self.tracks = []
+        self.next_id = 1
+
+    def update(self, detections, frame_idx):
+        events = []
+        predicted = np.array([track.predict(frame_idx) for track in self.tracks], dtype=np.float32).reshape(-1, 4)
+        pairs = self._match(predicted, detections[:, :4])
+        matched_tracks = {i for i, _ in pairs}
+        matched_detections = {j for _, j in pairs}
+
+        for i, j in pairs:
+            track = self.tracks[i]
+            dt = max(frame_idx - track.last_frame, 1)
+            # Альфа-бета фильтр: установившийся фильтр Калмана для модели постоянной скорости
+            residual = detections[j, :4] - predicted[i]
+            track.box = predicted[i] + self.alpha * residual
+            track.velocity = track.velocity + self.beta * residual / dt
+            track.score = float(detections[j, 4])
+            track.last_frame = frame_idx
+            event = self._update_class(track, int(detections[j, 5]), frame_idx)
+            if event is not None:
+                events.append(event)
+
+        kept = []
+        for i, track in enumerate(self.tracks):
+            if i in matched_tracks or frame_idx - track.last_frame <= self.max_age:
+                kept.append(track)
+            else:
+                events.append(self._event("disappear", track, frame_idx))
+        self.tracks = kept
+
+        for j in range(len(detections)):
+            if j not in matched_detections:
+                track = Track(self.next_id, detections[j, :4].astype(np.float32), float(detections[j, 4]),
+                              int(detections[j, 5]), frame_idx)
+                self.next_id += 1
+                self.tracks.append(track)
+                events.append(self._event("appear", track, frame_idx))
+        return events
+
+    def flush(self, frame_idx):
+        # Конец видео: живые треки тоже должны получить событие исчезновения
+        events = [self._event("disappear", track, frame_idx) for track in self.tracks]
+        self.tracks = []
+        return events
+
+    def boxes(self, frame_idx):
+        if not self.tracks:
+            return np.zeros((0, 7), dtype=np.float32)
+        return np.array([
+            [*track.predict(frame_idx), track.track_id, track.score, track.cls] for track in self.tracks
+        ], dtype=np.float32)
+
+    def _match(self, predicted, boxes):
+        if not len(predicted) or not len(boxes):
+            return []
+        # Класс не участвует в сопоставлении: смена класса у того же объекта и есть событие, которое мы ищем
+        iou = box_iou(predicted, boxes)
+        pairs = []
+        while iou.max() >= self.iou_threshold:
+            i, j = np.unravel_index(np.argmax(iou), iou.shape)
+            pairs.append((int(i), int(j)))
+            iou[i, :] = 0
+            iou[:, j] = 0
+        return pairs
+
+    def _update_class(self, track, cls, frame_idx):
+        if cls == track.cls:
+            track.pending_cls = None
+            track.pending_hits = 0
+            return None
+        if cls == track.pending_cls:
+            track.pending_hits += 1
+        else:
+            track.pending_cls = cls
+            track.pending_hits = 1
+        if track.pending_hits < self.confirm_hits:
+            return None
+        previous = track.cls
+        track.cls = cls
+        track.pending_cls = None
+        track.pending_hits = 0
+        return {"event": "class_change", "track_id": track.track_id, "from": previous, "to": cls, "frame": frame_idx,
+                "box": [round(float(v), 1) for v in track.box]}
+
+    @staticmethod
+    def _event(kind, track, frame_idx):
+        return {"event": kind, "track_id": track.track_id, "class": track.cls, "frame": frame_idx,
+                "box": [round(float(v), 1) for v in track.box]}
+
+
+class EventWriter:
+    def __init__(self, path, names):
+        self.names = names
+        self.count = 0
+        self._file = open(path, "w", encoding="utf-8") if path is not None else None
+
+    def write(self, events, video, fps):
+        for event in events:
+            record = {"video": str(video), "time": round(event["frame"] / fps, 3) if fps else None, **event}
+            for key in ("class", "from", "to"):
+                if key in record:
+                    record[key] = self.names.get(record[key], record[key])
+            if self._file is not None:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
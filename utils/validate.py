@@ -0,0 +1,151 @@
+import os
+import sys
+import json
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from utils.dataset import CLASS_NAMES
+
+
+ERROR_CHECKS = ("malformed_line", "bad_class", "out_of_range", "zero_area")
+WARNING_CHECKS = ("box_outside_image", "duplicate_box", "orphan_label", "missing_label")
+
+
+def validate_annotations(frame_dir, annotation_dir, report_path=None, workers=None, chunk_size=256, eps=1e-6):
+    frames = _scan(frame_dir, ".jpg")
+    labels = _scan(annotation_dir, ".txt")
+    labels.discard("classes")
+
+    label_names = sorted(labels)
+    chunks = [label_names[i:i + chunk_size] for i in range(0, len(label_names), chunk_size)]
+    issues = []
+    file_idx, line_no, values = [], [], []
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parsed = executor.map(_parse_chunk, [(annotation_dir, chunk) for chunk in chunks])
+        for chunk_start, (chunk_files, chunk_lines, chunk_values, malformed) in zip(range(0, len(label_names), chunk_size), parsed):
+            file_idx.append(chunk_files + chunk_start)
+            line_no.append(chunk_lines)
+            values.append(chunk_values)
+            issues.extend(
+                _issue("malformed_line", f"{label_names[chunk_start + i]}.txt", line, text)
+                for i, line, text in malformed
+            )
+
+    file_idx = np.concatenate(file_idx) if file_idx else np.empty(0, dtype=np.int64)
+    line_no = np.concatenate(line_no) if line_no else np.empty(0, dtype=np.int64)
+    values = np.concatenate(values) if values else np.empty((0, 5))
+    classes, boxes = values[:, 0], values[:, 1:]
+
+    bad_class = (classes != np.round(classes)) | (classes < 0) | (classes >= len(CLASS_NAMES))
+    x, y, w, h = boxes.T
+    out_of_range = np.any((boxes < -eps) | (boxes > 1 + eps), axis=1)
+    outside_image = ~out_of_range & (
+        (x - w / 2 < -eps) | (x + w / 2 > 1 + eps) | (y - h / 2 < -eps) | (y + h / 2 > 1 + eps)
+    )
+    zero_area = (w <= eps) | (h <= eps)
+
+    keys = np.column_stack([file_idx, np.round(values * 1e6)])
+    _, first = np.unique(keys, axis=0, return_index=True)
+    duplicate = np.ones(len(values), dtype=bool)
+    duplicate[first] = False
+
+    for check, mask in (("bad_class", bad_class), ("out_of_range", out_of_range),
+                        ("zero_area", zero_area), ("box_outside_image", outside_image),
+                        ("duplicate_box", duplicate)):
+        for i in np.flatnonzero(mask):
+            row = " ".join(f"{v:g}" for v in values[i])
+            issues.append(_issue(check, f"{label_names[file_idx[i]]}.txt", int(line_no[i]), row))
+
+    issues.extend(_issue("orphan_label", f"{name}.txt") for name in sorted(labels - frames))
+    issues.extend(_issue("missing_label", f"{name}.jpg") for name in sorted(frames - labels))
+
+    counts = {check: 0 for check in ERROR_CHECKS + WARNING_CHECKS}
+    for issue in issues:
+        counts[issue["check"]] += 1
+    errors = sum(counts[check] for check in ERROR_CHECKS)
+    report = {
+        "frame_dir": str(frame_dir),
+        "annotation_dir": str(annotation_dir),
+        "frames": len(frames),
+        "label_files": len(labels),
+        "boxes": int(len(values)),
+        "class_counts": dict(zip(CLASS_NAMES, np.bincount(
+            classes[~bad_class].astype(np.int64), minlength=len(CLASS_NAMES)).tolist())),
+        "counts": counts,
+        "errors": errors,
+        "warnings": sum(counts[check] for check in WARNING_CHECKS),
+        "issues": issues
+    }
+
+    if report_path is not None:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"Проверено {len(labels)} файлов аннотаций ({report['boxes']} рамок) для {len(frames)} кадров: "
+          f"ошибок {errors}, предупреждений {report['warnings']}")
+    for check, count in counts.items():
+        if count:
+            print(f"  {check}: {count}")
+    return report
+
+
+def exit_code(report, strict=False):
+    if report["errors"] or (strict and report["warnings"]):
+        return 1
+    return 0
+
+
+def _scan(directory, suffix):
+    if not os.path.isdir(directory):
+        return set()
+    with os.scandir(directory) as entries:
+        return {entry.name[:-len(suffix)] for entry in entries if entry.is_file() and entry.name.endswith(suffix)}
+
+
+def _parse_chunk(task):
+    annotation_dir, names = task
+    file_idx, line_no, rows, malformed = [], [], [], []
+    for i, name in enumerate(names):
+        with open(os.path.join(annotation_dir, f"{name}.txt"), "r") as f:
+            for line_number, line in enumerate(f, start=1):
+                fields = line.split()
+                if not fields:
+                    continue
+                try:
+                    row = [float(v) for v in fields]
+                except ValueError:
+                    row = []
+                if len(row) != 5:
+                    malformed.append((i, line_number, line.strip()))
+                    continue
+                file_idx.append(i)
+                line_no.append(line_number)
+                rows.append(row)
+    return (
+        np.array(file_idx, dtype=np.int64),
+        np.array(line_no, dtype=np.int64),
+        np.array(rows, dtype=np.float64).reshape(-1, 5),
+        malformed
+    )
+
+
+def _issue(check, name, line=None, detail=None):
+    severity = "error" if check in ERROR_CHECKS else "warning"
+    issue = {"check": check, "severity": severity, "file": name}
+    if line is not None:
+        issue["line"] = line
+    if detail is not None:
+        issue["detail"] = detail
+    return issue
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Проверка аннотаций YOLO")
+    parser.add_argument("frame_dir")
+    parser.add_argument("annotation_dir")
+    parser.add_argument("--report", default="annotation_report.json")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--strict", action="store_true")
+    args = parser.parse_args()
+    sys.exit(exit_code(validate_annotations(args.frame_dir, args.annotation_dir, args.report, args.workers), args.strict))
@@ -1,61 +1,246 @@
 import cv2
-from ultralytics import YOLO
-from pathlib import Path
-
-
-def create_inference_video(model_path, video_paths, output_path):
-    model = YOLO(model_path)
-    
-    temp_videos = []
-    
-    width, height, fps = None, None, None
-    
-    for idx, video_path in enumerate(video_paths):
+import time
+import queue
+import threading
+import numpy as np
+from utils import profiling
+from utils.detections import open_detection_sink
+from utils.models import get_model
+from utils.motion import MotionGate
+from utils.render import OverlayRenderer
+from utils.tracker import EventWriter, IoUTracker
+
+
+_END = object()
+
+
+def create_inference_video(model_path, video_paths, output_path, queue_size=64,
+                           batch_size=1, max_wait=0.05, num_threads=None, backend="torch",
+                           motion_threshold=None, refresh_interval=30, track_interval=None, events_path=None,
+                           sidecar_path=None):
+    if output_path is None and sidecar_path is None:
+        raise ValueError("Нужно указать output_path для видео или sidecar_path для детекций")
+    model = get_model(model_path, backend, imgsz=640, conf=0.5, num_threads=num_threads)
+    gate = MotionGate(motion_threshold, refresh_interval) if motion_threshold is not None else None
+    events = EventWriter(events_path, model.names)
+    renderer = OverlayRenderer(model.names) if output_path is not None else None
+    sidecar = open_detection_sink(sidecar_path, model.names) if sidecar_path is not None else None
+
+    frame_queue = queue.Queue(maxsize=queue_size)
+    plot_queue = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+    video_info = {}
+    stats = {"latencies": [], "skipped": 0}
+    errors = []
+
+    reader = threading.Thread(
+        target=_run_stage,
+        args=(_read_frames, (video_paths, frame_queue, video_info, gate, track_interval, stop_event),
+              stop_event, errors),
+        daemon=True
+    )
+    writer = threading.Thread(
+        target=_run_stage,
+        args=(_write_outputs, (plot_queue, output_path, renderer, sidecar, video_info, stats, stop_event),
+              stop_event, errors),
+        daemon=True
+    )
+    start_time = time.perf_counter()
+    reader.start()
+    writer.start()
+
+    try:
+        finished = False
+        last_boxes = None
+        tracker = None
+        tracked_video = None
+        tracked_frame = 0
+        while not finished and not stop_event.is_set():
+            batch, finished = _collect_batch(frame_queue, batch_size, max_wait, stop_event)
+            if batch:
+                frames = [item[3] for item in batch if item[4]]
+                detections = iter(model.predict(frames) if frames else [])
+                for video_idx, frame_idx, read_time, frame, infer in batch:
+                    if track_interval is not None and video_idx != tracked_video:
+                        if tracker is not None:
+                            events.write(tracker.flush(tracked_frame), *video_info[tracked_video])
+                        tracker = IoUTracker()
+                        tracked_video = video_idx
+                    tracked_frame = frame_idx
+                    if infer:
+                        last_boxes = next(detections)
+                        if tracker is not None:
+                            events.write(tracker.update(last_boxes, frame_idx), *video_info[video_idx])
+                    else:
+                        stats["skipped"] += 1
+                        profiling.count("frames_skipped")
+                    boxes = tracker.boxes(frame_idx) if tracker is not None else last_boxes
+                    _put(plot_queue, (video_idx, frame_idx, read_time, frame if renderer is not None else None, boxes),
+                         stop_event)
+                profiling.count("batches")
+        if tracker is not None:
+            events.write(tracker.flush(tracked_frame), *video_info[tracked_video])
+        _put(plot_queue, _END, stop_event)
+    except BaseException:
+        stop_event.set()
+        raise
+    finally:
+        reader.join()
+        writer.join()
+        events.close()
+        if sidecar is not None:
+            sidecar.close()
+
+    if errors:
+        raise errors[0]
+
+    if not video_info.get("written"):
+        print("Ошибка: Не удалось обработать ни одно видео.")
+        return
+    if output_path is not None:
+        print(f"Итоговое видео сохранено в {output_path}")
+    if sidecar_path is not None:
+        print(f"Детекции сохранены в {sidecar_path}")
+    if events_path is not None:
+        print(f"Событий трекинга: {events.count}, сохранены в {events_path}")
+
+    elapsed = time.perf_counter() - start_time
+    latencies = np.array(stats["latencies"]) * 1000
+    skip_ratio = stats["skipped"] / len(latencies)
+    print(
+        f"Кадров: {len(latencies)}, {len(latencies) / elapsed:.1f} кадр/с, "
+        f"задержка p50 {np.percentile(latencies, 50):.1f} мс, p95 {np.percentile(latencies, 95):.1f} мс, "
+        f"пропущено моделью {skip_ratio:.1%} "
+        f"(backend={backend}, batch_size={batch_size}, max_wait={max_wait}, threads={num_threads or 'auto'})"
+    )
+    return {
+        "frames": len(latencies),
+        "fps": len(latencies) / elapsed,
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "skip_ratio": skip_ratio,
+        "events": events.count
+    }
+
+
+def _run_stage(stage, args, stop_event, errors):
+    try:
+        stage(*args)
+    except BaseException as e:
+        errors.append(e)
+        stop_event.set()
+
+
+def _put(q, item, stop_event):
+    while not stop_event.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(q, stop_event):
+    while not stop_event.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _END
+
+
+def _collect_batch(frame_queue, batch_size, max_wait, stop_event):
+    first = _get(frame_queue, stop_event)
+    if first is _END:
+        return [], True
+
+    batch = [first]
+    deadline = time.perf_counter() + max_wait
+    while len(batch) < batch_size:
+        timeout = deadline - time.perf_counter()
+        if timeout <= 0:
+            break
+        try:
+            item = frame_queue.get(timeout=timeout)
+        except queue.Empty:
+            break
+        if item is _END:
+            return batch, True
+        batch.append(item)
+    return batch, False
+
+
+def _read_frames(video_paths, frame_queue, video_info, gate, track_interval, stop_event):
+    for video_idx, video_path in enumerate(video_paths):
         cap = cv2.VideoCapture(str(video_path))
         if not cap.isOpened():
             print(f"Ошибка: Не удалось открыть {video_path}")
             continue
-        
-        if width is None or height is None or fps is None:
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            fps = int(cap.get(cv2.CAP_PROP_FPS))
-        
-        temp_output = f"temp_inference_{idx}.mp4"
-        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-        out = cv2.VideoWriter(temp_output, fourcc, fps, (width, height))
-        
-        while cap.isOpened():
-            ret, frame = cap.read()
+
+        if "fps" not in video_info:
+            video_info["width"] = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            video_info["height"] = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            video_info["fps"] = int(cap.get(cv2.CAP_PROP_FPS))
+        # fps у каждого видео свой: по нему считаются времена детекций в sidecar и событий
+        video_info[video_idx] = (video_path, cap.get(cv2.CAP_PROP_FPS))
+        if gate is not None:
+            gate.reset()
+
+        frame_idx = 0
+        while not stop_event.is_set():
+            with profiling.timer("decode"):
+                ret, frame = cap.read()
             if not ret:
                 break
-            results = model.predict(frame, imgsz=640, conf=0.5)
-            annotated_frame = results[0].plot()
-            out.write(annotated_frame)
-        
+            profiling.count("frames_decoded")
+            read_time = time.perf_counter()
+            if track_interval is not None:
+                infer = frame_idx % track_interval == 0
+            else:
+                infer = gate is None or gate.should_infer(frame)
+            _put(frame_queue, (video_idx, frame_idx, read_time, frame, infer), stop_event)
+            frame_idx += 1
         cap.release()
-        out.release()
-        temp_videos.append(temp_output)
-        print(f"Обработано видео: {video_path}, сохранено во временный файл: {temp_output}")
-    
-
-    if temp_videos:
-        final_out = cv2.VideoWriter(str(output_path), fourcc, fps, (width, height))
-        
-        for temp_video in temp_videos:
-            cap = cv2.VideoCapture(temp_video)
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                final_out.write(frame)
-            cap.release()
-        
-        final_out.release()
-        print(f"Итоговое видео сохранено в {output_path}")
-        
-        for temp_video in temp_videos:
-            Path(temp_video).unlink()
-            print(f"Удален временный файл: {temp_video}")
-    else:
-        print("Ошибка: Не удалось обработать ни одно видео.")
\ No newline at end of file
+
+        if stop_event.is_set():
+            return
+    _put(frame_queue, _END, stop_event)
+
+
+def _write_outputs(plot_queue, output_path, renderer, sidecar, video_info, stats, stop_event):
+    out = None
+    current_video = None
+    try:
+        while True:
+            item = _get(plot_queue, stop_event)
+            if item is _END:
+                break
+            video_idx, frame_idx, read_time, frame, boxes = item
+            video_info["written"] = True
+            if video_idx != current_video:
+                if current_video is not None:
+                    print(f"Обработано видео: {video_info[current_video][0]}")
+                current_video = video_idx
+
+            if sidecar is not None:
+                video_path, fps = video_info[video_idx]
+                sidecar.write(video_path, frame_idx, fps, boxes)
+            if renderer is not None:
+                if out is None:
+                    size = (video_info["width"], video_info["height"])
+                    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+                    out = cv2.VideoWriter(str(output_path), fourcc, video_info["fps"], size)
+                with profiling.timer("plot"):
+                    frame = renderer.draw(frame, boxes)
+                if (frame.shape[1], frame.shape[0]) != size:
+                    frame = cv2.resize(frame, size)
+                with profiling.timer("encode"):
+                    out.write(frame)
+                profiling.count("frames_written")
+            stats["latencies"].append(time.perf_counter() - read_time)
+    finally:
+        if out is not None:
+            out.release()
+
+    if current_video is not None:
+        print(f"Обработано видео: {video_info[current_video][0]}")